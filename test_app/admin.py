@@ -1,5 +1,5 @@
 from django.contrib import admin
 
-from .models import User, Category, Course, Enrollment, Comment
+from .models import User, Category, Course, Enrollment, Comment, OutboxEmail
 
-admin.site.register([User, Category, Course, Enrollment, Comment])
\ No newline at end of file
+admin.site.register([User, Category, Course, Enrollment, Comment, OutboxEmail])
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TestAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'test_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,177 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+from .caching import CachedResponseMixin
+from .hashers import aoffload
+from .instrumentation import profile_section
+from .renderers import FastJSONRenderer
+from .serializers import UserLoginSerializer
+from .streaming import NDJSONRenderer
+from .views import (
+    CategoryList, CommentList, CourseList, EnrollmentListByStudent, TeacherList, UserLoginApiView, UserRegistrationView,
+)
+
+
+class AsyncAPIView(View):
+    """Native async handlers in front of the DRF view in `view_class`.
+
+    Methods a subclass does not implement are handed to the sync DRF view.
+    """
+    view_class = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Same as DRF: authentication classes enforce CSRF where it applies.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def get_drf_view(self, request, *args, **kwargs):
+        view = self.view_class()
+        view.setup(request, *args, **kwargs)
+        view.request = view.initialize_request(request, *args, **kwargs)
+        view.headers = view.default_response_headers
+        return view
+
+    async def run(self, request, handler, *args, **kwargs):
+        """Await `handler(view)` inside the DRF view's request cycle."""
+        view = self.get_drf_view(request, *args, **kwargs)
+        try:
+            await sync_to_async(view.initial)(view.request, *args, **kwargs)
+            response = await handler(view)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        return await self.render(view, response)
+
+    async def render(self, view, response):
+        response = view.finalize_response(view.request, response)
+        if not isinstance(response, Response):
+            return response  # e.g. a 304 from the response cache
+        with profile_section('render'):
+            if isinstance(response.accepted_renderer, FastJSONRenderer):
+                return response.render()
+            # Other renderers, such as the browsable API, may query the database.
+            return await sync_to_async(response.render)()
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self.view_class.as_view())(request, *args, **kwargs)
+
+    get = post = put = patch = delete = options = delegate
+
+
+class AsyncListView(AsyncAPIView):
+    """Native async GET for a read-heavy DRF list view.
+
+    The DRF view in `view_class` still owns the queryset, filtering, pagination
+    and serializer; only the queries run through the async ORM, so under ASGI
+    the request stays on the event loop instead of hopping to a worker thread
+    for the whole view. Every other method is handed to the sync DRF view.
+
+    The DRF view's `initial()` (authentication, permissions, throttles,
+    content negotiation), response cache and exception handling all apply,
+    so responses match the sync view's byte for byte.
+
+    The serializer runs on the loop, so the DRF view's queryset must preload
+    everything it reads (its `select_related_fields`/`get_prefetches` plan);
+    a lazy query there raises SynchronousOnlyOperation rather than silently
+    blocking.
+    """
+    chunk_size = 200
+
+    def get_queryset(self, view):
+        return view.filter_queryset(view.get_queryset())
+
+    def wants_stream(self, view, request):
+        if not hasattr(view, 'get_stream_format'):
+            return False
+        return view.get_stream_format() is not None or NDJSONRenderer.media_type in request.headers.get('Accept', '')
+
+    async def get_data(self, view, queryset):
+        if view.paginator is not None:
+            page = await view.paginator.apaginate_queryset(queryset, view.request, view)
+            if page is not None:
+                return view.paginator.get_paginated_data(view.get_serializer(page, many=True).data)
+        objects = [obj async for obj in queryset.aiterator(chunk_size=self.chunk_size)]
+        return view.get_serializer(objects, many=True).data
+
+    async def get(self, request, *args, **kwargs):
+        view = self.get_drf_view(request, *args, **kwargs)
+        if self.wants_stream(view, request):
+            # Streaming responses iterate a sync queryset; leave them to the DRF view.
+            return await self.delegate(request, *args, **kwargs)
+        try:
+            await sync_to_async(view.initial)(view.request, *args, **kwargs)
+            entry = None
+            if isinstance(view, CachedResponseMixin):
+                entry = await sync_to_async(view.get_cache_entry)()
+                cached = await sync_to_async(view.get_cached_response)(view.request, entry)
+                if cached is not None:
+                    return await self.render(view, cached)
+            # `get_queryset` may itself look rows up (see EnrollmentListByStudent).
+            queryset = await sync_to_async(self.get_queryset)(view)
+            response = Response(await self.get_data(view, queryset))
+            if entry is not None:
+                response = await sync_to_async(view.cache_response)(response, entry)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        return await self.render(view, response)
+
+
+class AsyncCourseList(AsyncListView):
+    view_class = CourseList
+
+
+class AsyncCategoryList(AsyncListView):
+    view_class = CategoryList
+
+
+class AsyncTeacherList(AsyncListView):
+    view_class = TeacherList
+
+
+class AsyncEnrollmentListByStudent(AsyncListView):
+    view_class = EnrollmentListByStudent
+
+
+class AsyncCommentList(AsyncListView):
+    view_class = CommentList
+
+
+class AsyncLoginView(AsyncAPIView):
+    """Login that waits for the password check without holding a thread.
+
+    `UserLoginApiView` blocks its worker thread until the hashing pool is done;
+    here only the pool thread is busy, so under ASGI a burst of logins costs
+    PASSWORD_HASHING_WORKERS threads rather than one per request.
+    """
+    view_class = UserLoginApiView
+
+    async def post(self, request, *args, **kwargs):
+        return await self.run(request, self.login, *args, **kwargs)
+
+    async def login(self, view):
+        serializer = UserLoginSerializer(data=view.request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors)
+        user = await aoffload(
+            authenticate, username=serializer.validated_data['username'], password=serializer.validated_data['password'],
+        )
+        return await sync_to_async(view.login_response)(view.request, user)
+
+
+class AsyncRegistrationView(AsyncAPIView):
+    """Registration that hashes the password the same way as `AsyncLoginView`."""
+    view_class = UserRegistrationView
+
+    async def post(self, request, *args, **kwargs):
+        return await self.run(request, self.register, *args, **kwargs)
+
+    async def register(self, view):
+        serializer = view.serializer_class(data=view.request.data, context={'hash_password': False})
+        if not await sync_to_async(serializer.is_valid)():
+            return Response(serializer.errors)
+        serializer.validated_data['password'] = await aoffload(make_password, serializer.validated_data['password'])
+        return await sync_to_async(view.register)(serializer)
@@ -0,0 +1,56 @@
+import copy
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.authentication import TokenAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .lru import LRUCache
+
+token_cache = LRUCache(
+    maxsize=getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 60),
+)
+
+
+def invalidate_token(key):
+    token_cache.delete(key)
+
+
+def invalidate_user(user_id):
+    token_cache.delete_where(lambda entry: entry[0].pk == user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that remembers the token -> user lookup for a short TTL.
+
+    Deleting a token (logout) or saving a user (e.g. deactivation) drops the
+    affected entries through the handlers in `test_app.signals`; other
+    processes see the change once their entry expires.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached)
+        user, token = cached
+        # Hand every request its own instance so per-request state never leaks.
+        return copy.copy(user), token
+
+
+class ClaimsUser(TokenUser):
+    """The user as described by a JWT's claims; no database row is loaded.
+
+    simplejwt stores `user_id` as a string, so expose it as an int for `pk`
+    comparisons against model instances.
+    """
+
+    @cached_property
+    def id(self):
+        return int(self.token[jwt_settings.USER_ID_CLAIM])
+
+    @property
+    def pk(self):
+        return self.id
@@ -0,0 +1,148 @@
+import math
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.db.models import Count, Exists, Max, OuterRef
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.authtoken.models import Token
+
+from .models import User, Category, Course, Enrollment, Comment
+from .tokens import issue_tokens
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (which need not be sorted)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and latency percentiles (in milliseconds) for one run."""
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+class BenchmarkFixture:
+    """The users, credentials and row ids `endpoint_requests` fills its URLs and payloads from.
+
+    Uses whatever data is in the database (see `manage.py seed_data`). The
+    student it logs in as is `bench-student`, created on first use; the
+    teacher is the one teaching the most popular course.
+    """
+    password = 'bench-password'
+
+    def __init__(self):
+        self.student = self._user('bench-student', 'student')
+        busiest = (
+            Enrollment.objects.values('student').annotate(total=Count('id')).order_by('-total').first()
+        )
+        self.busiest_student_id = busiest['student'] if busiest else self.student.pk
+        # Teachers only see their own courses in detail, so act as the teacher of the busiest one.
+        course = Course.objects.filter(teacher__isnull=False).select_related('teacher').order_by('-enrollment_count', 'id').first()
+        self.course_id = course.pk if course else None
+        self.latest_comment_id = Comment.objects.filter(course_id=self.course_id).aggregate(latest=Max('id'))['latest'] or 0
+        self.teacher = course.teacher if course else self._user('bench-teacher', 'teacher')
+        self.category_id = Category.objects.values_list('id', flat=True).first()
+        self.free_course_ids = list(
+            Course.objects.exclude(enrollment__student=self.student).order_by('id').values_list('id', flat=True)
+        )
+        # Comments need an enrollment without one.
+        self.commentable = list(
+            Enrollment.objects.exclude(
+                Exists(Comment.objects.filter(student=OuterRef('student'), course=OuterRef('course')))
+            ).order_by('id').values_list('student', 'course')[:1000]
+        )
+        self.uid = urlsafe_base64_encode(force_bytes(self.student.pk))
+        self.activation_token = default_token_generator.make_token(self.student)
+
+    def _user(self, username, role):
+        user, created = User.objects.get_or_create(
+            username=username, defaults={'role': role, 'email': f'{username}@example.com', 'is_active': True},
+        )
+        if created:
+            user.set_password(self.password)
+            user.save(update_fields=['password'])
+        return user
+
+    def headers(self, role):
+        """Authorization header for `role` ('student', 'teacher' or None) in the configured AUTH_MODE."""
+        if role is None:
+            return {}
+        user = getattr(self, role)
+        if settings.AUTH_MODE == 'jwt':
+            return {'HTTP_AUTHORIZATION': f'Bearer {issue_tokens(user)["access"]}'}
+        # Fetched per request: logging out deletes the token.
+        return {'HTTP_AUTHORIZATION': f'Token {Token.objects.get_or_create(user=user)[0].key}'}
+
+
+def endpoint_requests(fixture):
+    """One or more representative requests for every route in `test_app.urls`.
+
+    Each is a dict with a unique `name` (the URL name, plus a variant after
+    a colon), `method`, `path`, `auth` (the fixture role to authenticate as,
+    or None) and `data`, a function of the iteration number returning the
+    JSON body, so that writes never collide with each other. Logging out
+    comes last because it invalidates the student's token. The
+    `course-events` stream never completes, so it is left out.
+    """
+    student, courses = fixture.student, fixture.free_course_ids
+    reads = [
+        ('user-list', '/api/users/', None),
+        ('user-detail', f'/api/users/{fixture.busiest_student_id}/', None),
+        ('category-list', '/api/categories/', None),
+        ('course-list', '/api/courses/', None),
+        ('course-list:search', '/api/courses/?q=course', None),
+        ('course-list:sparse', '/api/courses/?fields=id,title,price', None),
+        ('course-list:ndjson', '/api/courses/?stream=ndjson', None),
+        ('course-detail', f'/api/courses/{fixture.course_id}/', 'teacher'),
+        ('enrollment-list', '/api/enrollments/', 'student'),
+        ('enrollments-by-student', f'/api/enrollments/student/{fixture.busiest_student_id}/', None),
+        ('comment-list', '/api/comments/', None),
+        ('comment-list:course', f'/api/comments/?course={fixture.course_id}', None),
+        ('comment-list:poll', f'/api/comments/?course={fixture.course_id}&after_id={fixture.latest_comment_id}', None),
+        ('teacher-list', '/api/teachers/', None),
+        ('list_urls', '/api/', None),
+        ('activate', f'/api/active/{fixture.uid}/{fixture.activation_token}/', None),
+    ]
+    requests = [
+        {'name': name, 'method': 'GET', 'path': path, 'auth': auth, 'data': None}
+        for name, path, auth in reads
+    ]
+    half = len(courses) // 2
+    writes = [
+        ('register', '/api/register/', None, lambda i: {
+            'username': f'bench-register-{i}', 'email': f'bench-register-{i}@example.com',
+            'first_name': 'Bench', 'last_name': f'Register{i}', 'specialization': 'none', 'image': '',
+            'password': 'Bench-pass-1', 'confirm_password': 'Bench-pass-1', 'role': 'student',
+        }),
+        ('login', '/api/login/', None, lambda i: {'username': student.username, 'password': fixture.password}),
+        ('token-refresh', '/api/token/refresh/', None, lambda i: {'refresh': issue_tokens(student)['refresh']}),
+        ('course-create', '/api/courses/create/', 'teacher', lambda i: {
+            'title': f'bench course {i}', 'description': 'benchmark', 'teacher': fixture.teacher.pk,
+            'category': fixture.category_id, 'price': '10.00',
+        }),
+        ('enrollment-list:create', '/api/enrollments/', 'student', lambda i: {
+            'student': student.pk, 'course': courses[i % half],
+        }),
+        ('enrollment-bulk-create', '/api/enrollments/bulk/', 'student', lambda i: [
+            {'student': student.pk, 'course': course} for course in courses[half:][i * 5 % half:][:5]
+        ]),
+        ('comment-list:create', '/api/comments/', None, lambda i: {
+            'student': fixture.commentable[i][0], 'course': fixture.commentable[i][1], 'content': 'benchmark',
+        }),
+        ('logout', '/api/logout/', 'student', lambda i: {}),
+    ]
+    requests += [
+        {'name': name, 'method': 'POST', 'path': path, 'auth': auth, 'data': data}
+        for name, path, auth, data in writes
+    ]
+    return requests
@@ -0,0 +1,114 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+KEY_PREFIX = 'response'
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:version:{namespace}'
+
+
+def get_versions(namespaces):
+    """Return {namespace: version}; a version is the time_ns of the last change."""
+    cache = get_response_cache()
+    keys = {_version_key(namespace): namespace for namespace in namespaces}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, namespace in keys.items():
+        if namespace not in versions:
+            # An evicted or never-written version starts over from "now", which
+            # can only invalidate entries, never resurrect stale ones.
+            now = time.time_ns()
+            cache.add(key, now, timeout=None)
+            versions[namespace] = cache.get(key, now)
+    return versions
+
+
+def bump(*namespaces):
+    """Invalidate every cached response that depends on `namespaces` once the transaction commits."""
+    def _bump():
+        now = time.time_ns()
+        get_response_cache().set_many({_version_key(namespace): now for namespace in namespaces}, timeout=None)
+    transaction.on_commit(_bump)
+
+
+class CachedResponseMixin:
+    """Serve GET responses from the response cache.
+
+    Entries store the serialized `response.data`, so a hit skips the queryset
+    and serializer work entirely. Keys embed the current version of every
+    namespace in `cache_namespaces`; the signal handlers in `test_app.signals`
+    bump those versions when the underlying rows change.
+    """
+    cache_namespaces = ()
+    cache_per_user = False
+
+    def get_cache_namespaces(self):
+        return [namespace.format(**self.kwargs) for namespace in self.cache_namespaces]
+
+    def get_cache_key(self, versions):
+        request = self.request
+        parts = [
+            self.__class__.__name__,
+            repr(sorted(self.kwargs.items())),
+            repr(sorted(request.query_params.lists())),
+            request.get_host(),
+            request.META.get('HTTP_ACCEPT', ''),
+            repr(sorted(versions.items())),
+        ]
+        if self.cache_per_user:
+            parts.append(str(request.user.pk))
+        digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+        return f'{KEY_PREFIX}:{digest}'
+
+    def get_cache_entry(self):
+        """`(key, etag, last_modified)` of this request at the current namespace versions."""
+        versions = get_versions(self.get_cache_namespaces())
+        key = self.get_cache_key(versions)
+        last_modified = max(versions.values()) // 10**9 if versions else None
+        return key, f'"{key.rsplit(":", 1)[-1]}"', last_modified
+
+    def get_cached_response(self, request, entry):
+        """A 304 or the cached response for `entry`; None on a miss."""
+        key, etag, last_modified = entry
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        data = get_response_cache().get(key)
+        if data is None:
+            return None
+        return self.add_cache_headers(Response(data), entry)
+
+    def cache_response(self, response, entry):
+        """Store a freshly built 200 response under `entry`."""
+        if response.status_code != 200 or response.streaming:
+            return response
+        get_response_cache().set(entry[0], response.data, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+        return self.add_cache_headers(response, entry)
+
+    def add_cache_headers(self, response, entry):
+        _, etag, last_modified = entry
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    def get(self, request, *args, **kwargs):
+        entry = self.get_cache_entry()
+        response = self.get_cached_response(request, entry)
+        if response is None:
+            response = self.cache_response(super().get(request, *args, **kwargs), entry)
+        return response
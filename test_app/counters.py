@@ -0,0 +1,71 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import User, Category, Course, Enrollment, Comment
+
+# (source model, foreign key attname, target model, counter field)
+COUNTERS = [
+    (Course, 'category_id', Category, 'course_count'),
+    (Course, 'teacher_id', User, 'course_count'),
+    (Enrollment, 'course_id', Course, 'enrollment_count'),
+    (Comment, 'course_id', Course, 'comment_count'),
+]
+
+
+def counters_for(model):
+    return [counter for counter in COUNTERS if counter[0] is model]
+
+
+def adjust(target, field, pk, delta):
+    if pk is None:
+        return
+    queryset = target.objects.filter(pk=pk)
+    if delta < 0:
+        # Never push a counter below zero if it drifted; `rebuild` fixes drift.
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def adjust_bulk(source, instances, delta=1):
+    """Apply counter changes for rows written with bulk_create(), which sends no signals."""
+    for _, fk, target, field in counters_for(source):
+        parents_by_delta = defaultdict(list)
+        for pk, total in Counter(getattr(instance, fk) for instance in instances).items():
+            parents_by_delta[total * delta].append(pk)
+        for parent_delta, pks in parents_by_delta.items():
+            target.objects.filter(pk__in=pks).update(**{field: F(field) + parent_delta})
+
+
+def actual_counts(source, fk, target):
+    counts = (
+        source.objects.filter(**{fk: OuterRef('pk')})
+        .order_by()
+        .values(fk)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def verify():
+    """Return (target, field, pk, stored, actual) for every counter that drifted."""
+    mismatches = []
+    for source, fk, target, field in COUNTERS:
+        rows = (
+            target.objects.annotate(actual=actual_counts(source, fk, target))
+            .exclude(**{field: F('actual')})
+            .values_list('pk', field, 'actual')
+        )
+        for pk, stored, actual in rows:
+            mismatches.append((target, field, pk, stored, actual))
+    return mismatches
+
+
+def rebuild():
+    """Recompute every counter column, returning the number of rows updated."""
+    updated = 0
+    for source, fk, target, field in COUNTERS:
+        updated += target.objects.update(**{field: actual_counts(source, fk, target)})
+    return updated
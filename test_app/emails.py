@@ -0,0 +1,52 @@
+import re
+import uuid
+
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils.autoreload import file_changed
+from django.utils.html import escape
+
+_templates = []
+
+
+class PrecompiledTemplate:
+    """A template rendered once, after which only its variables are substituted.
+
+    The template is rendered with unique placeholders and split around them;
+    `render` then joins the static chunks with the escaped values. This is only
+    valid for variables used verbatim (`{{ name }}`, no filters or tags that
+    inspect the value), which holds for our transactional emails.
+    """
+
+    def __init__(self, template_name, variables):
+        self.template_name = template_name
+        self.variables = tuple(variables)
+        self._chunks = None
+        _templates.append(self)
+
+    def compile(self):
+        token = uuid.uuid4().hex
+        placeholders = {name: f'{token}{name}{token}' for name in self.variables}
+        rendered = render_to_string(self.template_name, placeholders)
+        # With a capturing group, split() alternates literal text and variable names.
+        pieces = re.split(f'{token}(\\w+){token}', rendered)
+        self._chunks = [(piece, index % 2 == 1) for index, piece in enumerate(pieces) if piece]
+        return self._chunks
+
+    def reset(self):
+        self._chunks = None
+
+    def render(self, **context):
+        chunks = self._chunks or self.compile()
+        return ''.join(escape(context[piece]) if is_variable else piece for piece, is_variable in chunks)
+
+
+confirm_email = PrecompiledTemplate('confirm_email.html', ['confirm_link'])
+
+
+@receiver(file_changed, dispatch_uid='test_app.emails.reset_precompiled_templates')
+def reset_precompiled_templates(sender, file_path, **kwargs):
+    # The dev server reloads templates in place rather than restarting.
+    if file_path.suffix == '.html':
+        for template in _templates:
+            template.reset()
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import os
+import socket
+import tempfile
+import threading
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .renderers import FastJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# Queued in place of an event when a slow subscriber is being disconnected.
+CLOSED = object()
+
+
+class Subscription:
+    """One listener's bounded queue, owned by the event loop that created it.
+
+    When the queue is full, `drop_oldest` discards the oldest event to make
+    room (counting it in `dropped`), and `disconnect` ends the subscription
+    so the client reconnects and catches up from the REST feeds.
+    """
+
+    def __init__(self, hub, channel, maxsize, policy):
+        self.hub = hub
+        self.channel = channel
+        self.policy = policy
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, message):
+        # Always runs on `self.loop`.
+        if self.closed:
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            if self.policy == 'disconnect':
+                self.closed = True
+                self.hub.unsubscribe(self)
+                message = CLOSED
+            else:
+                self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """The next message, CLOSED, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.closed = True
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """In-process fan-out from channels to subscriptions on any event loop.
+
+    `publish` is thread-safe and never blocks: each subscriber's loop gets
+    the message through `call_soon_threadsafe`, and a full queue is that
+    subscriber's problem (see `Subscription`), not the publisher's.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel, maxsize=100, policy='drop_oldest'):
+        subscription = Subscription(self, channel, maxsize, policy)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:  # the loop has shut down
+                self.unsubscribe(subscription)
+
+
+hub = Hub()
+
+
+class LocalBroker:
+    """Delivers events to the subscribers of this process only."""
+
+    def __init__(self, **kwargs):
+        self.deliver = hub.publish
+
+    def start(self):
+        pass
+
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+
+class DatagramBroker:
+    """Relays events between the processes of one host over Unix datagram sockets.
+
+    A dependency-free stand-in for a network broker (e.g. Redis pub/sub) in
+    multi-process tests and single-host deployments: every process binds a
+    socket in `path` and `publish` sends each event to all of them,
+    including its own. Sockets left behind by dead processes are removed
+    when a send to them fails. Packets over `max_size` are never sent (see
+    COURSE_EVENTS['MAX_EVENT_SIZE']) and a send failure is only logged:
+    publishing runs after the request's transaction has committed.
+    """
+    max_size = 64 * 1024
+
+    def __init__(self, path=None, **kwargs):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'course-events')
+        self.address = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # A process whose buffer is full misses the event rather than stalling the publisher.
+        self._sender.setblocking(False)
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.address is not None:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            self.address = os.path.join(self.path, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.sock')
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(self.address)
+        threading.Thread(target=self._receive, args=(receiver,), daemon=True, name='course-events').start()
+
+    def _receive(self, receiver):
+        while True:
+            # One byte more than allowed shows that the kernel cut a packet short.
+            packet = receiver.recv(self.max_size + 1)
+            if len(packet) > self.max_size:
+                logger.warning('Dropped a course event over %d bytes', self.max_size)
+                continue
+            channel, _, message = packet.partition(b'\n')
+            hub.publish(channel.decode(), message)
+
+    def publish(self, channel, message):
+        packet = channel.encode() + b'\n' + message
+        if len(packet) > self.max_size:
+            logger.warning('Not sending a %d-byte event on %s: over %d bytes', len(packet), channel, self.max_size)
+            return
+        for name in os.listdir(self.path) if os.path.isdir(self.path) else ():
+            peer = os.path.join(self.path, name)
+            try:
+                self._sender.sendto(packet, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                if peer != self.address:
+                    try:
+                        os.unlink(peer)
+                    except FileNotFoundError:
+                        pass
+            except BlockingIOError:
+                pass
+            except OSError:
+                logger.exception('Could not send a course event to %s', peer)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        config = settings.COURSE_EVENTS
+        _broker = import_string(config['BROKER'])(**config.get('OPTIONS', {}))
+    return _broker
+
+
+def course_channel(course_id):
+    return f'course:{course_id}'
+
+
+def format_event(event, event_id, data):
+    """A server-sent event frame, rendered once and shared by every subscriber."""
+    return b'id: %s\nevent: %s\ndata: %s\n\n' % (event_id.encode(), event.encode(), FastJSONRenderer().render(data))
+
+
+def publish_on_commit(course_id, event, event_id, data):
+    """Send `data` to the course's event stream once the current transaction commits.
+
+    Events over COURSE_EVENTS['MAX_EVENT_SIZE'] bytes carry only the object's
+    `id` and `"partial": true`; clients fetch the rest through the REST API.
+    """
+    message = format_event(event, event_id, data)
+    if len(message) > settings.COURSE_EVENTS.get('MAX_EVENT_SIZE', 32 * 1024):
+        message = format_event(event, event_id, {'id': data['id'], 'partial': True})
+    # robust: a broker failure is logged, never turned into an error for a committed request.
+    transaction.on_commit(lambda: get_broker().publish(course_channel(course_id), message), robust=True)
@@ -0,0 +1,162 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject, PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+from .instrumentation import ProfiledSerializerMixin
+
+# Fields whose `to_representation` is a plain type conversion.
+_CONVERTERS = {
+    serializers.CharField.to_representation: str,
+    serializers.IntegerField.to_representation: int,
+}
+
+
+def _model_fields(model, source_attrs):
+    """Resolve `source_attrs` to model fields, following forward relations only."""
+    fields = []
+    for position, attr in enumerate(source_attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if position < len(source_attrs) - 1:
+            if not (field.many_to_one or field.one_to_one) or field.auto_created:
+                return None
+            model = field.related_model
+        fields.append(field)
+    return fields
+
+
+def _generic(field):
+    # Exactly what `Serializer.to_representation` does for one field.
+    def get(instance):
+        attribute = field.get_attribute(instance)
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        if check_for_none is None:
+            return None
+        return field.to_representation(attribute)
+    return get
+
+
+def _datetime_converter(field):
+    # `DateTimeField.to_representation` with the timezone looked up once per
+    # compile rather than once per value.
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if not value or isinstance(value, str) or value.utcoffset() is None:
+            return field.to_representation(value)
+        try:
+            value = value.astimezone(field_timezone).isoformat()
+        except OverflowError:
+            return field.to_representation(value)
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _column(field, model_fields):
+    fallback = _generic(field)
+    *path, last = model_fields
+    path = [model_field.name for model_field in path]
+
+    if isinstance(field, PrimaryKeyRelatedField) and field.use_pk_only_optimization() and field.pk_field is None:
+        if not last.many_to_one:
+            return fallback
+        attname, convert = last.attname, None
+    elif last.is_relation:
+        return fallback
+    else:
+        attname = last.attname
+        if type(field).to_representation is serializers.DateTimeField.to_representation:
+            convert = _datetime_converter(field)
+        else:
+            convert = _CONVERTERS.get(type(field).to_representation, field.to_representation)
+
+    def get(instance):
+        target = instance
+        for name in path:
+            target = getattr(target, name)
+            if target is None:
+                # Let DRF decide between None and skipping the field.
+                return fallback(instance)
+        value = getattr(target, attname)
+        if value is None or convert is None:
+            return value
+        return convert(value)
+    return get
+
+
+def _nested_list(field):
+    row = compile_representation(field.child)
+    attr = field.source_attrs[0]
+
+    def get(instance):
+        # A prefetched relation is what `manager.all()` would return, without
+        # building the related manager for every row.
+        prefetched = getattr(instance, '_prefetched_objects_cache', None)
+        if prefetched and attr in prefetched:
+            return [row(item) for item in prefetched[attr]]
+        related = getattr(instance, attr)
+        if related is None:
+            return None
+        iterable = related.all() if isinstance(related, models.manager.BaseManager) else related
+        return [row(item) for item in iterable]
+    return get
+
+
+def compile_representation(serializer):
+    """Return a function producing `serializer.to_representation(instance)`.
+
+    Each readable field is resolved once into a plain accessor: model columns
+    are read straight off the instance (related primary keys from `<fk>_id`),
+    method fields call the bound `get_<name>` method and nested lists recurse.
+    Anything else goes through the field's own `get_attribute` and
+    `to_representation`, so the output is always what DRF would produce.
+    """
+    if type(serializer).to_representation is not serializers.Serializer.to_representation:
+        return serializer.to_representation
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    plan = []
+    for field in serializer._readable_fields:
+        source_attrs = field.source_attrs
+        if isinstance(field, serializers.SerializerMethodField):
+            get = getattr(serializer, field.method_name)
+        elif isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.Serializer) \
+                and len(source_attrs) == 1:
+            get = _nested_list(field)
+        elif model is not None and source_attrs:
+            model_fields = _model_fields(model, source_attrs)
+            get = _column(field, model_fields) if model_fields else _generic(field)
+        else:
+            get = _generic(field)
+        plan.append((field.field_name, get))
+    plan = tuple(plan)
+
+    def to_representation(instance):
+        ret = {}
+        for name, get in plan:
+            try:
+                ret[name] = get(instance)
+            except SkipField:
+                pass
+        return ret
+    return to_representation
+
+
+class FastListSerializer(ProfiledSerializerMixin, serializers.ListSerializer):
+    """`ListSerializer` that renders its rows through `compile_representation`.
+
+    Set as `Meta.list_serializer_class`, so every `many=True` read (list
+    endpoints and nested lists) takes the fast path; writes are unchanged.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        row = compile_representation(self.child)
+        return [row(item) for item in iterable]
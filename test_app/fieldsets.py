@@ -0,0 +1,93 @@
+def parse_field_list(value):
+    """`'id, title'` -> `{'id', 'title'}`; None when the parameter is absent."""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def field_selected(name, selection, expandable_fields=()):
+    """Whether field `name` is rendered for a `{'fields', 'omit', 'expand'}` selection.
+
+    `fields` limits the output to the listed fields, `omit` drops fields and
+    `expand` lists which of the `expandable_fields` (the expensive nested
+    ones) to render; without `expand` they follow `fields` like any other.
+    """
+    fields, omit, expand = selection.get('fields'), selection.get('omit'), selection.get('expand')
+    if omit and name in omit:
+        return False
+    if name in expandable_fields and expand is not None:
+        return name in expand
+    return fields is None or name in fields
+
+
+class DynamicFieldsMixin:
+    """Serializer mixin dropping the fields the request did not select.
+
+    The selection comes from the `field_selection` context entry set by
+    `FieldSelectionMixin`; dropped fields are never computed. Serializers
+    nested as fields are built without context and always render in full.
+    """
+    expandable_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selection = self.context.get('field_selection')
+        if selection:
+            for name in list(self.fields):
+                if not field_selected(name, selection, self.expandable_fields):
+                    self.fields.pop(name)
+
+
+class FieldSelectionMixin:
+    """View mixin for `?fields=`, `?omit=` and `?expand=` on GET requests.
+
+    Passes the selection to the serializer and prunes the queryset plan to
+    match: `select_related_fields` maps a relation to the output fields that
+    read it, `prefetch_related_fields` maps an output field to its prefetch
+    lookup, and only the ones backing a selected field are applied.
+    """
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    def get_field_selection(self):
+        if not hasattr(self, '_field_selection'):
+            self._field_selection = None
+            if self.request.method in ('GET', 'HEAD'):
+                params = self.request.query_params
+                selection = {key: parse_field_list(params.get(key)) for key in ('fields', 'omit', 'expand')}
+                if any(value is not None for value in selection.values()):
+                    self._field_selection = selection
+        return self._field_selection
+
+    def field_selected(self, name):
+        selection = self.get_field_selection()
+        if selection is None:
+            return True
+        return field_selected(name, selection, getattr(self.get_serializer_class(), 'expandable_fields', ()))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['field_selection'] = self.get_field_selection()
+        return context
+
+    def get_select_related(self):
+        return [
+            relation for relation, names in self.select_related_fields.items()
+            if any(self.field_selected(name) for name in names)
+        ]
+
+    def get_prefetches(self):
+        return [lookup for name, lookup in self.prefetch_related_fields.items() if self.field_selected(name)]
+
+    def apply_field_plan(self, queryset):
+        select_related = self.get_select_related()
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        prefetches = self.get_prefetches()
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset
+
+    def get_queryset(self):
+        # Views overriding `get_queryset` call `apply_field_plan` themselves.
+        return self.apply_field_plan(super().get_queryset())
@@ -0,0 +1,70 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.contrib.auth.hashers import Argon2PasswordHasher, BCryptSHA256PasswordHasher, PBKDF2PasswordHasher
+
+# Cost parameters come from PASSWORD_HASHING_COST. Django rehashes a password
+# on the next successful login whenever its stored algorithm or cost differs
+# from the first entry of PASSWORD_HASHERS, so changing either is transparent.
+_cost = getattr(settings, 'PASSWORD_HASHING_COST', {})
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = _cost.get('ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+    memory_cost = _cost.get('ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+    parallelism = _cost.get('ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class TunableBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    rounds = _cost.get('BCRYPT_ROUNDS', BCryptSHA256PasswordHasher.rounds)
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = _cost.get('PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+_executor = None
+
+
+def offload(func, *args, **kwargs):
+    """Run a CPU-heavy hashing call on the bounded hashing pool.
+
+    Enabled by PASSWORD_HASHING_OFFLOAD (which `test_drf.asgi` turns on): at
+    most PASSWORD_HASHING_WORKERS hashes run at once, however many login or
+    registration requests arrive, so they cannot take every CPU away from the
+    rest of the API. Otherwise the call runs inline.
+
+    The caller's thread blocks until the hash is done; async views use
+    `aoffload` instead.
+    """
+    if not getattr(settings, 'PASSWORD_HASHING_OFFLOAD', False):
+        return func(*args, **kwargs)
+    return _get_executor().submit(_run_in_pool, func, *args, **kwargs).result()
+
+
+async def aoffload(func, *args, **kwargs):
+    """Async `offload`: the request waits on the event loop, not on a thread."""
+    if not getattr(settings, 'PASSWORD_HASHING_OFFLOAD', False):
+        return await sync_to_async(func)(*args, **kwargs)
+    return await asyncio.wrap_future(_get_executor().submit(_run_in_pool, func, *args, **kwargs))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', 2),
+            thread_name_prefix='password-hashing',
+        )
+    return _executor
+
+
+def _run_in_pool(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Pool threads never see request_finished; release their DB connection here.
+        close_old_connections()
@@ -0,0 +1,253 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .benchmarking import percentile
+
+logger = logging.getLogger(__name__)
+
+# The profile of the request being handled, if profiling is on.
+_current = contextvars.ContextVar('request_profile', default=None)
+_log_lock = threading.Lock()
+
+
+class RequestProfile:
+    """Timings and SQL statements collected for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []  # (sql, seconds)
+        self.sql_time = 0.0
+        self.sections = defaultdict(float)
+        self.open_sections = set()
+        self.render_started = None
+
+    def add(self, section, started, sql_before):
+        """Charge the time since `started` to `section`, less the SQL run meanwhile."""
+        self.sections[section] += time.perf_counter() - started - (self.sql_time - sql_before)
+
+    def __call__(self, execute, sql, params, many, context):
+        # `connection.execute_wrapper` hook.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries.append((sql, elapsed))
+            self.sql_time += elapsed
+
+    def repeated_queries(self, threshold):
+        """[(count, sql)] for statements run at least `threshold` times, most repeated first.
+
+        Statements are compared before parameter binding, so a query issued
+        once per row of a list shows up here as one entry.
+        """
+        counts = Counter(sql for sql, _ in self.queries)
+        return [(count, sql) for sql, count in counts.most_common() if count >= threshold]
+
+
+class profile_section:
+    """Add the time spent in the block, minus SQL run inside it, to `section`.
+
+    A no-op outside a profiled request. Nested blocks for the same section
+    only count the outermost one.
+    """
+
+    def __init__(self, section):
+        self.section = section
+
+    def __enter__(self):
+        self.profile = _current.get()
+        if self.profile is not None:
+            if self.section in self.profile.open_sections:
+                self.profile = None
+            else:
+                self.profile.open_sections.add(self.section)
+                self.started = time.perf_counter(), self.profile.sql_time
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profile is not None:
+            self.profile.open_sections.discard(self.section)
+            self.profile.add(self.section, *self.started)
+
+
+class ProfiledSerializerMixin:
+    """Serializer mixin timing `.data` as the `serialize` section of the request profile."""
+
+    @property
+    def data(self):
+        with profile_section('serialize'):
+            return super().data
+
+
+def _profile_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+def _watch_queries(sender=None, connection=None, **kwargs):
+    if _profile_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profile_query)
+
+
+def _server_timing(profile, total):
+    count = len(profile.queries)
+    metrics = [f'db;dur={profile.sql_time * 1000:.2f};desc="{count} quer{"y" if count == 1 else "ies"}"']
+    for section, seconds in profile.sections.items():
+        metrics.append(f'{section};dur={seconds * 1000:.2f}')
+    metrics.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(metrics)
+
+
+class RequestProfilingMiddleware:
+    """Per-request query count, SQL time, serializer time and render time.
+
+    Enabled by `REQUEST_PROFILING`; when it is off Django drops the
+    middleware at startup, so it costs nothing. When on, every response
+    gets a `Server-Timing` header (`db`, `serialize`, `render`, `total`)
+    and one JSON line per request is appended to `REQUEST_PROFILING_LOG`,
+    keyed by URL name, for `manage.py profiling_report` to aggregate.
+    Statements repeated `REQUEST_PROFILING_N_PLUS_ONE` or more times in one
+    request are logged as likely N+1 queries.
+
+    Streaming responses are measured up to the point their headers are
+    sent; the rows produced while streaming are not counted. Under ASGI the
+    middleware stays async, so it adds no thread hop in front of async views.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.log_path = settings.REQUEST_PROFILING_LOG
+        self.threshold = getattr(settings, 'REQUEST_PROFILING_N_PLUS_ONE', 5)
+        # Async views run their queries on other threads, each with its own
+        # connections; the hook on every connection finds the profile through
+        # the context variable, which sync_to_async carries over.
+        connection_created.connect(_watch_queries)
+        for connection in connections.all(initialized_only=True):
+            _watch_queries(connection=connection)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return await sync_to_async(self.finish, thread_sensitive=False)(request, response, profile)
+
+    def finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        response['Server-Timing'] = _server_timing(profile, total)
+        self.record(request, response, profile, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Runs right before `response.render()`; the callback right after it.
+        profile = _current.get()
+        if profile is not None:
+            profile.render_started = time.perf_counter(), profile.sql_time
+            response.add_post_render_callback(lambda response: self.rendered(profile))
+        return response
+
+    def rendered(self, profile):
+        profile.add('render', *profile.render_started)
+
+    def record(self, request, response, profile, total):
+        match = request.resolver_match
+        name = match.view_name if match is not None else '<unresolved>'
+        repeated = profile.repeated_queries(self.threshold)
+        for count, sql in repeated:
+            logger.warning('Possible N+1 in %s %s (%s): %d x %s', request.method, request.path, name, count, sql)
+        sample = {
+            'name': name,
+            'method': request.method,
+            'status': response.status_code,
+            'total': total,
+            'db': profile.sql_time,
+            'queries': len(profile.queries),
+            'serialize': profile.sections.get('serialize', 0.0),
+            'render': profile.sections.get('render', 0.0),
+            'repeated': repeated[:3],
+        }
+        line = json.dumps(sample) + '\n'
+        with _log_lock, open(self.log_path, 'a') as log:
+            log.write(line)
+
+
+def read_samples(path):
+    samples = []
+    try:
+        with open(path) as log:
+            for line in log:
+                if line.strip():
+                    samples.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return samples
+
+
+def aggregate(samples):
+    """Per-URL-name report: latency percentiles (ms), query counts and N+1 hits."""
+    by_name = defaultdict(list)
+    for sample in samples:
+        by_name[sample['name']].append(sample)
+
+    def ms(values, pct):
+        return round(percentile(values, pct) * 1000, 2)
+
+    report = {}
+    for name, rows in sorted(by_name.items()):
+        total = [row['total'] for row in rows]
+        db = [row['db'] for row in rows]
+        queries = [row['queries'] for row in rows]
+        repeated = Counter()
+        for row in rows:
+            for count, sql in row['repeated']:
+                repeated[sql] = max(repeated[sql], count)
+        report[name] = {
+            'requests': len(rows),
+            'p50_ms': ms(total, 50),
+            'p95_ms': ms(total, 95),
+            'p99_ms': ms(total, 99),
+            'db_p50_ms': ms(db, 50),
+            'db_p95_ms': ms(db, 95),
+            'db_share': round(sum(db) / sum(total), 3) if sum(total) else None,
+            'serialize_p95_ms': ms([row['serialize'] for row in rows], 95),
+            'render_p95_ms': ms([row['render'] for row in rows], 95),
+            'queries_p50': percentile(queries, 50),
+            'queries_max': max(queries),
+            'n_plus_one_requests': sum(1 for row in rows if row['repeated']),
+            'repeated_sql': [[count, sql] for sql, count in repeated.most_common(3)],
+        }
+    return report
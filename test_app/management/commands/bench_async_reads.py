@@ -0,0 +1,112 @@
+import asyncio
+import importlib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import clear_url_caches
+
+from test_app.benchmarking import summarize
+from test_app.models import User, Category, Course, Enrollment, Comment
+
+READ_VIEWS = ['course-list', 'category-list', 'teacher-list', 'enrollments-by-student', 'comment-list']
+
+
+def reload_urlconf():
+    import test_app.urls
+    importlib.reload(test_app.urls)
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/s and p99 latency of the read endpoints served by the sync DRF views '
+        'under WSGI and ASGI, and by the native async views under ASGI, at a given concurrency. '
+        'Runs in-process through the WSGI/ASGI handlers, with the response cache disabled.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and mode.')
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--courses', type=int, default=50)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        student = self.seed(tag, options['courses'])
+        urls = {
+            'course-list': '/api/courses/',
+            'category-list': '/api/categories/',
+            'teacher-list': '/api/teachers/',
+            'enrollments-by-student': f'/api/enrollments/student/{student.pk}/',
+            'comment-list': '/api/comments/',
+        }
+        try:
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+                for mode in ('wsgi', 'asgi-sync', 'asgi-async'):
+                    with override_settings(ASYNC_READ_VIEWS=READ_VIEWS if mode == 'asgi-async' else []):
+                        reload_urlconf()
+                        for name, url in urls.items():
+                            report = self.run_mode(mode, url, options['requests'], options['concurrency'])
+                            self.stdout.write(f'{mode:<10} {name:<24} {report}')
+        finally:
+            reload_urlconf()
+            User.objects.filter(username__startswith=f'bench-{tag}-').delete()
+            Category.objects.filter(name=f'bench-{tag}').delete()
+
+    def seed(self, tag, course_count):
+        category = Category.objects.create(name=f'bench-{tag}', description='benchmark')
+        teacher = User.objects.create(username=f'bench-{tag}-teacher', role='teacher', is_active=True)
+        students = User.objects.bulk_create([
+            User(username=f'bench-{tag}-student-{i}', role='student', is_active=True) for i in range(20)
+        ])
+        courses = Course.objects.bulk_create([
+            Course(title=f'bench {i}', description='benchmark', teacher=teacher, category=category, price='10.00')
+            for i in range(course_count)
+        ])
+        Enrollment.objects.bulk_create([Enrollment(student=s, course=c) for c in courses for s in students[:5]])
+        Comment.objects.bulk_create([Comment(student=s, course=c, content='benchmark') for c in courses for s in students[:3]])
+        return students[0]
+
+    def run_mode(self, mode, url, total, concurrency):
+        if mode == 'wsgi':
+            return self.run_threads(url, total, concurrency)
+        return asyncio.run(self.run_async(url, total, concurrency))
+
+    def run_threads(self, url, total, concurrency):
+        def worker(count):
+            client = Client()
+            latencies = []
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    client.get(url)
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            return latencies
+
+        counts = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = [latency for result in executor.map(worker, counts) for latency in result]
+        return summarize(latencies, time.perf_counter() - started)
+
+    async def run_async(self, url, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                await client.get(url)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return summarize(latencies, time.perf_counter() - started)
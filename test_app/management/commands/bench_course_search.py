@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from test_app.models import User, Category, Course
+from test_app.search import search_courses, search_terms
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare ?q= search on the course search index with icontains filtering, '
+        'counting the matches and fetching the first page over --courses synthetic courses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=100000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = [
+            ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10)))
+            for _ in range(5000)
+        ]
+        queries = [
+            vocabulary[0],                              # one common word
+            vocabulary[-1][:3],                         # short prefix
+            f'{vocabulary[10]} {vocabulary[20][:4]}',   # word and prefix
+            'zzzzqqqq',                                 # no match
+        ]
+        # Everything runs in a transaction that is rolled back, leaving no benchmark rows behind.
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.seed(rng, vocabulary, options['courses'])
+            self.stdout.write(f'seeded {options["courses"]} courses in {time.perf_counter() - started:.1f} s')
+            courses = Course.objects.all()
+            for query in queries:
+                search = self.time(lambda: self.run(search_courses(courses, query).order_by('search_rank', 'id'), options), options['repeat'])
+                contains = self.time(lambda: self.run(self.icontains(courses, query).order_by('id'), options), options['repeat'])
+                self.stdout.write(
+                    f'{query!r:<22} matches={search[1]:<6} search {search[0] * 1e3:8.2f} ms   '
+                    f'icontains {contains[0] * 1e3:8.2f} ms (matches={contains[1]})'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, rng, vocabulary, count):
+        category = Category.objects.create(name='bench-search', description='benchmark')
+        teacher = User.objects.create(username='bench-search-teacher', role='teacher')
+        batch = []
+        for i in range(count):
+            batch.append(Course(
+                title=' '.join(rng.choices(vocabulary, k=4)).capitalize(),
+                description=' '.join(rng.choices(vocabulary, k=40)),
+                teacher=teacher, category=category, price='10.00',
+            ))
+            if len(batch) == 5000:
+                Course.objects.bulk_create(batch)
+                batch = []
+        Course.objects.bulk_create(batch)
+
+    def icontains(self, queryset, query):
+        for term in search_terms(query):
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return queryset
+
+    def run(self, queryset, options):
+        total = queryset.count()
+        list(queryset[:options['page_size']])
+        return total
+
+    def time(self, func, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+
+from test_app.emails import confirm_email
+
+
+class Command(BaseCommand):
+    help = 'Compare renders per second of the confirmation email: render_to_string vs. the precompiled template.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        links = [f'http://127.0.0.1:8000/api/active/MTA{i}/c{i}-token/' for i in range(iterations)]
+
+        if render_to_string('confirm_email.html', {'confirm_link': links[0]}) != confirm_email.render(confirm_link=links[0]):
+            raise CommandError('Precompiled output differs from render_to_string.')
+
+        started = time.perf_counter()
+        for link in links:
+            render_to_string('confirm_email.html', {'confirm_link': link})
+        baseline = iterations / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for link in links:
+            confirm_email.render(confirm_link=link)
+        precompiled = iterations / (time.perf_counter() - started)
+
+        self.stdout.write(f'render_to_string: {baseline:,.0f} renders/s')
+        self.stdout.write(f'precompiled:      {precompiled:,.0f} renders/s ({precompiled / baseline:.1f}x)')
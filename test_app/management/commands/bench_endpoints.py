@@ -0,0 +1,139 @@
+import json
+import logging
+import platform
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from test_app.benchmarking import BenchmarkFixture, endpoint_requests, summarize
+from test_app.seeding import seed
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Time every route in test_app.urls through the Django test client and record latency '
+        'percentiles, query counts and status codes as JSON. Seeds its own data inside a '
+        'transaction that is rolled back, unless --existing-data is given. With --compare, '
+        'exits with an error when an endpoint got slower than --tolerance or runs more queries.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per read endpoint.')
+        parser.add_argument('--write-iterations', type=int, default=10, help='Timed requests per write endpoint.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', default=None, help='Comma-separated endpoint names to run.')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--courses', type=int, default=200)
+        parser.add_argument('--enrollments', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument('--existing-data', action='store_true', help='Benchmark against the rows already in the database.')
+        parser.add_argument('--cache', action='store_true', help='Keep the response cache on (off by default).')
+        parser.add_argument('--output', default=None, help='Write the results to this JSON file.')
+        parser.add_argument('--compare', default=None, help='Baseline JSON file from an earlier run.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown against --compare.')
+
+    def handle(self, *args, **options):
+        only = set(options['only'].split(',')) if options['only'] else None
+        overrides = {
+            # Repeated logins would otherwise be throttled.
+            'LOGIN_RATE_LIMIT': {**settings.LOGIN_RATE_LIMIT, 'IP_ATTEMPTS': 10**9, 'USERNAME_ATTEMPTS': 10**9},
+        }
+        if not options['cache']:
+            overrides['RESPONSE_CACHE_TIMEOUT'] = 0
+
+        # 4xx responses are part of the catalogue; only log server errors.
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        with override_settings(**overrides), transaction.atomic():
+            if not options['existing_data']:
+                counts = seed(
+                    users=options['users'], courses=options['courses'], enrollments=options['enrollments'],
+                    comments=options['comments'], prefix='bench',
+                )
+                self.stdout.write(f'seeded {counts}')
+            fixture = BenchmarkFixture()
+            results = {}
+            for spec in endpoint_requests(fixture):
+                if only and spec['name'] not in only and spec['name'].split(':')[0] not in only:
+                    continue
+                iterations = options['iterations'] if spec['method'] == 'GET' else options['write_iterations']
+                results[spec['name']] = result = self.run(fixture, spec, iterations, options['warmup'])
+                self.stdout.write(
+                    f'{spec["name"]:<26} {result["status"]:<10} p50 {result["p50_ms"]:>8.2f} ms  '
+                    f'p95 {result["p95_ms"]:>8.2f} ms  p99 {result["p99_ms"]:>8.2f} ms  queries {result["queries"]}'
+                )
+            transaction.set_rollback(True)
+
+        report = {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'options': {key: options[key] for key in ('iterations', 'write_iterations', 'users', 'courses', 'enrollments', 'comments', 'existing_data', 'cache')},
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f'wrote {options["output"]}')
+        if options['compare']:
+            self.compare(report, options['compare'], options['tolerance'])
+
+    def run(self, fixture, spec, iterations, warmup):
+        client = Client(raise_request_exception=False)
+        latencies, queries, statuses = [], [], set()
+        for i in range(warmup + iterations):
+            headers = fixture.headers(spec['auth'])
+            data = spec['data'](i) if spec['data'] else None
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                if spec['method'] == 'GET':
+                    response = client.get(spec['path'], **headers)
+                else:
+                    response = client.post(spec['path'], data, content_type='application/json', **headers)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            if i >= warmup:
+                latencies.append(elapsed)
+                queries.append(len(captured))
+                statuses.add(response.status_code)
+        result = summarize(latencies, sum(latencies))
+        result.update(
+            method=spec['method'], path=spec['path'],
+            status=','.join(str(code) for code in sorted(statuses)),
+            queries=max(queries),
+        )
+        return result
+
+    def compare(self, report, path, tolerance):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = []
+        for name, result in report['endpoints'].items():
+            before = baseline['endpoints'].get(name)
+            if before is None:
+                continue
+            ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] else 1.0
+            flags = []
+            if ratio > 1 + tolerance:
+                flags.append(f'p50 x{ratio:.2f}')
+            if result['queries'] > before['queries']:
+                flags.append(f'queries {before["queries"]} -> {result["queries"]}')
+            self.stdout.write(f'{name:<26} p50 {before["p50_ms"]:>8.2f} -> {result["p50_ms"]:>8.2f} ms  {" ".join(flags)}')
+            if flags:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f'Regressed against {baseline.get("revision") or path}: {", ".join(regressions)}')
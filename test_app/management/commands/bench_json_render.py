@@ -0,0 +1,70 @@
+import io
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from test_app.models import User, Category, Course, Enrollment, Comment
+from test_app.parsers import FastJSONParser
+from test_app.renderers import FastJSONRenderer, orjson
+from test_app.views import CourseList
+
+
+class Command(BaseCommand):
+    help = 'Compare the stock JSON renderer/parser with the orjson-backed ones on a /api/courses/ page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=100, help='Courses on the page (max 100).')
+        parser.add_argument('--students', type=int, default=20, help='Enrolled and commenting students per course.')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write('orjson is not installed; FastJSONRenderer uses the stdlib encoder.')
+        # Everything runs in a transaction that is rolled back, leaving no benchmark rows behind.
+        with transaction.atomic():
+            self.seed(options['courses'], options['students'])
+            cache.clear()
+            request = APIRequestFactory().get(f'/api/courses/?page_size={options["courses"]}')
+            data = CourseList.as_view()(request).data
+            transaction.set_rollback(True)
+        cache.clear()
+
+        payload = JSONRenderer().render(data)
+        self.stdout.write(f'payload: {len(payload)} bytes, identical={FastJSONRenderer().render(data) == payload}')
+        for label, func in (
+            ('render', lambda renderer_class: lambda: renderer_class().render(data)),
+            ('parse', lambda parser_class: lambda: parser_class().parse(io.BytesIO(payload))),
+        ):
+            stock, fast = (JSONRenderer, FastJSONRenderer) if label == 'render' else (JSONParser, FastJSONParser)
+            stock_time = self.time(func(stock), options['repeat'])
+            fast_time = self.time(func(fast), options['repeat'])
+            self.stdout.write(
+                f'{label}: stock {stock_time * 1e3:.2f} ms, fast {fast_time * 1e3:.2f} ms ({stock_time / fast_time:.1f}x)'
+            )
+
+    def time(self, func, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) / repeat
+
+    def seed(self, course_count, student_count):
+        category = Category.objects.create(name='bench-json', description='benchmark')
+        teacher = User.objects.create(username='bench-json-teacher', role='teacher', image='https://example.com/t.png')
+        students = User.objects.bulk_create([
+            User(username=f'bench-json-student-{i}', role='student', email=f'student{i}@example.com')
+            for i in range(student_count)
+        ])
+        courses = Course.objects.bulk_create([
+            Course(title=f'Course {i}', description='Benchmark course', teacher=teacher, category=category, price='49.99')
+            for i in range(course_count)
+        ])
+        Enrollment.objects.bulk_create([Enrollment(student=s, course=c) for c in courses for s in students])
+        Comment.objects.bulk_create([
+            Comment(student=s, course=c, content='Great course, thanks!') for c in courses for s in students
+        ])
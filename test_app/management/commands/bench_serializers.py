@@ -0,0 +1,84 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from test_app.models import User, Category, Course, Enrollment, Comment
+from test_app.serializers import CategorySerializer, CommentSerializer, CourseSerializer, EnrollmentSerializer, UserSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the stock DRF ListSerializer with the compiled fast path used for list reads, '
+        'on fixtures of --rows rows per endpoint, and check that both render identical JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        # Everything runs in a transaction that is rolled back, leaving no benchmark rows behind.
+        with transaction.atomic():
+            self.seed(rows)
+            cases = [
+                ('users', UserSerializer, User.objects.filter(username__startswith='bench-ser-')),
+                ('categories', CategorySerializer, Category.objects.filter(name__startswith='bench-ser-')),
+                ('courses', CourseSerializer, Course.objects.filter(title__startswith='bench-ser-')
+                    .select_related('teacher', 'category')
+                    .prefetch_related(Prefetch('comments', Comment.objects.select_related('student')), 'students')),
+                ('enrollments', EnrollmentSerializer, Enrollment.objects.filter(course__title__startswith='bench-ser-')
+                    .select_related('student', 'course__teacher', 'course__category')),
+                ('comments', CommentSerializer, Comment.objects.filter(course__title__startswith='bench-ser-')
+                    .select_related('student')),
+            ]
+            for name, serializer_class, queryset in cases:
+                self.compare(name, serializer_class, list(queryset), options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, rows):
+        categories = Category.objects.bulk_create([
+            Category(name=f'bench-ser-{i}', description='benchmark') for i in range(rows)
+        ])
+        teachers = User.objects.bulk_create([
+            User(username=f'bench-ser-teacher-{i}', role='teacher', image='https://example.com/t.png') for i in range(rows // 2)
+        ])
+        students = User.objects.bulk_create([
+            User(username=f'bench-ser-student-{i}', role='student', email=f's{i}@example.com') for i in range(rows - rows // 2)
+        ])
+        courses = Course.objects.bulk_create([
+            Course(title=f'bench-ser-{i}', description='benchmark', teacher=teachers[i % len(teachers)],
+                   category=categories[i % len(categories)], price='19.99')
+            for i in range(rows)
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=students[i % len(students)], course=courses[i]) for i in range(rows)
+        ])
+        Comment.objects.bulk_create([
+            Comment(student=students[i % len(students)], course=courses[i], content='benchmark') for i in range(rows)
+        ])
+
+    def compare(self, name, serializer_class, objects, repeat):
+        context = {'request': None}
+        render = JSONRenderer().render
+        timings = {}
+        for label, build in (
+            ('drf', lambda: serializers.ListSerializer(objects, child=serializer_class(context=context), context=context)),
+            ('fast', lambda: serializer_class(objects, many=True, context=context)),
+        ):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                output = render(build().data)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = (best, output)
+        (drf_time, drf_output), (fast_time, fast_output) = timings['drf'], timings['fast']
+        self.stdout.write(
+            f'{name:<12} {len(objects)} rows: drf {drf_time * 1000:.1f} ms, fast {fast_time * 1000:.1f} ms '
+            f'({drf_time / fast_time:.1f}x), identical={drf_output == fast_output}'
+        )
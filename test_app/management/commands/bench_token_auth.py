@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from test_app.authentication import CachedTokenAuthentication, token_cache
+from test_app.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare DB queries and time per authenticated request for TokenAuthentication vs. CachedTokenAuthentication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=50)
+
+    def handle(self, *args, **options):
+        # Everything runs in a transaction that is rolled back, leaving no benchmark rows behind.
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f'bench-auth-{i}', role='student', is_active=True) for i in range(options['users'])
+            ])
+            tokens = Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
+            factory = APIRequestFactory()
+            requests = [
+                factory.get('/api/enrollments/', HTTP_AUTHORIZATION=f'Token {tokens[i % len(tokens)].key}')
+                for i in range(options['requests'])
+            ]
+
+            token_cache.clear()
+            for authentication_class in (TokenAuthentication, CachedTokenAuthentication):
+                authenticator = authentication_class()
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for request in requests:
+                        authenticator.authenticate(request)
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{authentication_class.__name__}: '
+                    f'{len(queries) / len(requests):.3f} queries/request, '
+                    f'{elapsed / len(requests) * 1e6:.1f} us/request'
+                )
+            transaction.set_rollback(True)
+        token_cache.clear()
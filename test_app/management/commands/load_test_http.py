@@ -0,0 +1,101 @@
+import http.client
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from test_app.benchmarking import BenchmarkFixture, endpoint_requests, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the read endpoints of a running server (runserver, gunicorn, uvicorn, ...) from '
+        'concurrent keep-alive connections and report throughput and latency percentiles per '
+        'endpoint. URLs and credentials come from this project\'s database, so point it at the '
+        'same DATABASE_URL as the server and seed it first with `manage.py seed_data`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run for.')
+        parser.add_argument('--only', default=None, help='Comma-separated endpoint names to drive.')
+        parser.add_argument('--output', default=None, help='Write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        base = urlsplit(options['base_url'])
+        if base.scheme not in ('http', 'https'):
+            raise CommandError('--base-url must be an http:// or https:// URL.')
+        only = set(options['only'].split(',')) if options['only'] else None
+        fixture = BenchmarkFixture()
+        targets = [
+            (spec['name'], spec['path'], fixture.headers(spec['auth']))
+            for spec in endpoint_requests(fixture)
+            # Only reads: writes are covered by `load_test_writes` and would pile up rows here.
+            if spec['method'] == 'GET' and spec['name'] != 'activate'
+            and (not only or spec['name'] in only or spec['name'].split(':')[0] in only)
+        ]
+        if not targets:
+            raise CommandError('No endpoints selected.')
+
+        latencies = defaultdict(list)
+        statuses = defaultdict(lambda: defaultdict(int))
+        errors = defaultdict(int)
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+        connection_class = http.client.HTTPSConnection if base.scheme == 'https' else http.client.HTTPConnection
+
+        def worker(offset):
+            connection = connection_class(base.hostname, base.port, timeout=30)
+            # Each worker cycles through every endpoint, starting at a different one.
+            for name, path, headers in itertools.islice(itertools.cycle(targets), offset, None):
+                if time.perf_counter() >= deadline:
+                    break
+                request_headers = {'Accept': 'application/json'}
+                if headers:
+                    request_headers['Authorization'] = headers['HTTP_AUTHORIZATION']
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=request_headers)
+                    response = connection.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    with lock:
+                        errors[name] += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies[name].append(elapsed)
+                    statuses[name][response.status] += 1
+            connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i % len(targets),)) for i in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        results = {}
+        for name, path, _ in targets:
+            results[name] = summarize(latencies[name], elapsed)
+            results[name].update(path=path, statuses=dict(statuses[name]), errors=errors[name])
+            self.stdout.write(f'{name:<26} {results[name]}')
+        overall = summarize([value for values in latencies.values() for value in values], elapsed)
+        overall['errors'] = sum(errors.values())
+        self.stdout.write(self.style.SUCCESS(f'overall: {overall}'))
+
+        if options['output']:
+            report = {
+                'base_url': options['base_url'], 'concurrency': options['concurrency'],
+                'duration': round(elapsed, 2), 'overall': overall, 'endpoints': results,
+            }
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f'wrote {options["output"]}')
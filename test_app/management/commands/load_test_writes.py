@@ -0,0 +1,89 @@
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from test_app.benchmarking import summarize
+from test_app.models import User, Category, Course
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer the enrollment and comment endpoints from concurrent threads against the '
+        'configured database. Each thread has its own connection, so writers contend for '
+        'the database lock as separate server workers would, but share one process. Compare '
+        'profiles by re-running with e.g. SQLITE_TUNED=1, the stock SQLite settings, or '
+        'DATABASE_URL=postgres://... (with and without DB_POOL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--courses', type=int, default=5)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows.')
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        self.stdout.write(f"Database: {database['ENGINE']} options={database.get('OPTIONS', {})} "
+                          f"CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}")
+
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'loadtest-{tag}', description='load test')
+        teacher = User.objects.create(username=f'loadtest-{tag}-teacher', role='teacher', is_active=True)
+        courses = [
+            Course.objects.create(title=f'loadtest {i}', description='load test', teacher=teacher, category=category, price='10.00')
+            for i in range(options['courses'])
+        ]
+        students = User.objects.bulk_create([
+            User(username=f'loadtest-{tag}-student-{i}', role='student', is_active=True)
+            for i in range(options['students'])
+        ])
+        tokens = Token.objects.bulk_create([Token(user=student, key=Token.generate_key()) for student in students])
+
+        latencies = defaultdict(list)
+        failures = defaultdict(int)
+        lock = threading.Lock()
+
+        def worker(jobs):
+            client = Client(raise_request_exception=False)
+            try:
+                for student, token, course in jobs:
+                    auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+                    requests = [
+                        ('enrollment', '/api/enrollments/', {'student': student.pk, 'course': course.pk}),
+                        ('comment', '/api/comments/', {'student': student.pk, 'course': course.pk, 'content': 'load test'}),
+                    ]
+                    for name, url, payload in requests:
+                        started = time.perf_counter()
+                        response = client.post(url, payload, content_type='application/json', **auth)
+                        elapsed = time.perf_counter() - started
+                        with lock:
+                            latencies[name].append(elapsed)
+                            if response.status_code != 201:
+                                failures[name] += 1
+            finally:
+                connection.close()
+
+        jobs = [(student, token, courses[i % len(courses)]) for i, (student, token) in enumerate(zip(students, tokens))]
+        threads = [threading.Thread(target=worker, args=(jobs[i::options['workers']],)) for i in range(options['workers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        for name in ('enrollment', 'comment'):
+            report = summarize(latencies[name], elapsed)
+            report['failures'] = failures[name]
+            self.stdout.write(f'{name}: {report}')
+
+        if not options['keep']:
+            User.objects.filter(username__startswith=f'loadtest-{tag}-').delete()
+            category.delete()
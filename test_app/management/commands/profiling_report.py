@@ -0,0 +1,48 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from test_app.instrumentation import aggregate, read_samples
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarize the samples recorded by RequestProfilingMiddleware per URL name: '
+        'latency p50/p95/p99, SQL time, query counts and likely N+1 queries.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=None, help='Sample file (default: REQUEST_PROFILING_LOG).')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+        parser.add_argument('--sort', default='db_p95_ms', help='Report column to sort by, descending.')
+        parser.add_argument('--reset', action='store_true', help='Empty the sample file after reporting.')
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.REQUEST_PROFILING_LOG
+        report = aggregate(read_samples(path))
+        rows = sorted(report.items(), key=lambda item: item[1].get(options['sort']) or 0, reverse=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(dict(rows), indent=2))
+        elif not rows:
+            self.stdout.write(f'No samples in {path}; set REQUEST_PROFILING=1 and send some requests.')
+        else:
+            self.stdout.write(
+                f'{"url name":<24} {"reqs":>6} {"p50":>8} {"p95":>8} {"p99":>8} {"db p95":>8} '
+                f'{"db %":>5} {"ser p95":>8} {"rnd p95":>8} {"queries":>7} {"n+1":>5}'
+            )
+            for name, stats in rows:
+                db_share = f'{stats["db_share"] * 100:.0f}' if stats['db_share'] is not None else '-'
+                self.stdout.write(
+                    f'{name:<24} {stats["requests"]:>6} {stats["p50_ms"]:>8.2f} {stats["p95_ms"]:>8.2f} '
+                    f'{stats["p99_ms"]:>8.2f} {stats["db_p95_ms"]:>8.2f} {db_share:>5} '
+                    f'{stats["serialize_p95_ms"]:>8.2f} {stats["render_p95_ms"]:>8.2f} '
+                    f'{stats["queries_p50"]:>3}/{stats["queries_max"]:<3} {stats["n_plus_one_requests"]:>5}'
+                )
+            for name, stats in rows:
+                for count, sql in stats['repeated_sql']:
+                    self.stdout.write(f'{name}: {count} x {sql}')
+
+        if options['reset']:
+            open(path, 'w').close()
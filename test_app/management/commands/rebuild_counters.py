@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from test_app.counters import rebuild, verify
+
+
+class Command(BaseCommand):
+    help = 'Verify and rebuild the denormalized course, enrollment and comment counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drifted counters; exit with an error if any are found.',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = verify()
+        for target, field, pk, stored, actual in mismatches:
+            self.stdout.write(f'{target.__name__}({pk}).{field}: stored {stored}, actual {actual}')
+
+        if options['check']:
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} counter(s) out of sync.')
+            self.stdout.write(self.style.SUCCESS('All counters are in sync.'))
+            return
+
+        with transaction.atomic():
+            updated = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters on {updated} row(s), fixed {len(mismatches)}.'))
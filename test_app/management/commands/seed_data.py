@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from test_app.seeding import clear, seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic users, categories, courses, enrollments and comments with a long-tailed '
+        'fan-out (a few popular courses, a few very active students). The same --seed always '
+        'produces the same data; --clear removes the rows of a --prefix again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--courses', type=int, default=200)
+        parser.add_argument('--enrollments', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument('--prefix', default='seed', help='Prefix of the generated usernames and category names.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--clear', action='store_true', help='Delete the rows of --prefix first.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = clear(options['prefix'])
+            self.stdout.write(f'Deleted {deleted} row(s) with prefix {options["prefix"]!r}.')
+            if not options['users']:
+                return
+
+        started = time.perf_counter()
+        counts = seed(
+            users=options['users'], categories=options['categories'], courses=options['courses'],
+            enrollments=options['enrollments'], comments=options['comments'],
+            prefix=options['prefix'], seed=options['seed'],
+        )
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Seeded {summary} in {time.perf_counter() - started:.1f} s.'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from test_app.outbox import drain
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails, reusing one mail connection per batch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = drain(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}.')
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Category = apps.get_model('test_app', 'Category')
+    Course = apps.get_model('test_app', 'Course')
+    Enrollment = apps.get_model('test_app', 'Enrollment')
+    Comment = apps.get_model('test_app', 'Comment')
+    User = apps.get_model('test_app', 'User')
+
+    def counts(source, fk):
+        return Coalesce(Subquery(
+            source.objects.filter(**{fk: OuterRef('pk')}).order_by()
+            .values(fk).annotate(total=Count('pk')).values('total')
+        ), 0)
+
+    Category.objects.update(course_count=counts(Course, 'category_id'))
+    User.objects.update(course_count=counts(Course, 'teacher_id'))
+    Course.objects.update(
+        enrollment_count=counts(Enrollment, 'course_id'),
+        comment_count=counts(Comment, 'course_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_app', '0002_alter_user_is_active_alter_user_user_permissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='course_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='course_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
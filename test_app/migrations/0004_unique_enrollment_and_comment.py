@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:50
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def deduplicate(apps, schema_editor):
+    Course = apps.get_model('test_app', 'Course')
+    Enrollment = apps.get_model('test_app', 'Enrollment')
+    Comment = apps.get_model('test_app', 'Comment')
+
+    # Keep the earliest row for every (student, course) pair.
+    for model in (Enrollment, Comment):
+        keep = model.objects.values('student_id', 'course_id').annotate(keep_id=Min('id')).values('keep_id')
+        model.objects.exclude(id__in=keep).delete()
+
+    def counts(source):
+        return Coalesce(Subquery(
+            source.objects.filter(course_id=OuterRef('pk')).order_by()
+            .values('course_id').annotate(total=Count('pk')).values('total')
+        ), 0)
+
+    Course.objects.update(enrollment_count=counts(Enrollment), comment_count=counts(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_app', '0003_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='comment',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_comment_per_course'),
+        ),
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_enrollment'),
+        ),
+    ]
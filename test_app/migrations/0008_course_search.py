@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:14
+
+import django.db.models.deletion
+import test_app.models
+from django.db import migrations, models
+
+# SQLite: an external-content FTS5 table over test_app_course, kept in sync by
+# triggers, so bulk_create() and queryset updates are indexed too. Ranking is
+# bm25 with titles weighted 10x; prefix indexes serve 2- and 3-letter prefixes.
+# A later migration that makes Django rebuild test_app_course on SQLite drops
+# these triggers and must run SQLITE_TRIGGERS again.
+SQLITE_TABLE = """
+CREATE VIRTUAL TABLE test_app_course_fts USING fts5(
+    title, description,
+    content='test_app_course', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)
+"""
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER test_app_course_fts_insert AFTER INSERT ON test_app_course BEGIN
+        INSERT INTO test_app_course_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER test_app_course_fts_delete AFTER DELETE ON test_app_course BEGIN
+        INSERT INTO test_app_course_fts(test_app_course_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER test_app_course_fts_update AFTER UPDATE OF title, description ON test_app_course BEGIN
+        INSERT INTO test_app_course_fts(test_app_course_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO test_app_course_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+SQLITE_SETUP = [
+    "INSERT INTO test_app_course_fts(test_app_course_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "INSERT INTO test_app_course_fts(test_app_course_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS test_app_course_fts_insert',
+    'DROP TRIGGER IF EXISTS test_app_course_fts_delete',
+    'DROP TRIGGER IF EXISTS test_app_course_fts_update',
+    'DROP TABLE IF EXISTS test_app_course_fts',
+]
+
+# PostgreSQL: a stored generated tsvector (title weighted A, description B)
+# with a GIN index; the database keeps it current on every write.
+POSTGRESQL_CREATE = [
+    """
+    ALTER TABLE test_app_course ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX course_search_vector_idx ON test_app_course USING GIN (search_vector)',
+]
+POSTGRESQL_DROP = [
+    'DROP INDEX IF EXISTS course_search_vector_idx',
+    'ALTER TABLE test_app_course DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        statements = [SQLITE_TABLE, *SQLITE_TRIGGERS, *SQLITE_SETUP]
+    elif vendor == 'postgresql':
+        statements = POSTGRESQL_CREATE
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for statement in {'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}.get(vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_app', '0007_revoked_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSearchIndex',
+            fields=[
+                ('course', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='test_app.course')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('document', test_app.models.SearchDocumentField(db_column='test_app_course_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'test_app_course_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
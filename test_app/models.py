@@ -1,7 +1,26 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, Permission
+from django.utils import timezone
 
-class User(AbstractUser):
+
+class CounterFieldsMixin:
+    """Keep denormalized counters out of full saves.
+
+    Counters are only written with F() updates from `test_app.signals`, so a
+    stale in-memory instance must not overwrite them when it is saved.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     ROLE_CHOICES = (
         ('teacher', 'Teacher'),
         ('student', 'Student'),
@@ -10,6 +29,8 @@ class User(AbstractUser):
     specialization = models.CharField(max_length=20, blank=True, null=True)
     image = models.URLField(blank=True, null=True)
     is_active = models.BooleanField(default=False)
+    course_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('course_count',)
 
     user_permissions = models.ManyToManyField(
         Permission,
@@ -21,16 +42,22 @@ class User(AbstractUser):
 
     class Meta:
         app_label = 'test_app'
+        indexes = [
+            # TeacherList filters on role.
+            models.Index(fields=['role'], name='user_role_idx'),
+        ]
 
 
-class Category(models.Model):
+class Category(CounterFieldsMixin, models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
+    course_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('course_count',)
 
     def __str__(self):
         return f"{self.name}"
 
-class Course(models.Model):
+class Course(CounterFieldsMixin, models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     teacher = models.ForeignKey(User, limit_choices_to={'role': 'teacher'}, related_name='courses_taught', on_delete=models.CASCADE, null=True, blank=True)
@@ -38,25 +65,141 @@ class Course(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     students = models.ManyToManyField(User, through='Enrollment', related_name='courses_enrolled')
+    enrollment_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('enrollment_count', 'comment_count')
+
+    class Meta:
+        # CourseList filters by teacher/category and orders by created_at or title.
+        indexes = [
+            models.Index(fields=['category', 'created_at'], name='course_category_created_idx'),
+            models.Index(fields=['teacher', 'created_at'], name='course_teacher_created_idx'),
+            models.Index(fields=['created_at'], name='course_created_idx'),
+            models.Index(fields=['title'], name='course_title_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Counters are updated from post_save, keep them in the same transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+class SearchDocumentField(models.TextField):
+    """The hidden column of an FTS5 table named after the table itself."""
+
+
+@SearchDocumentField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class CourseSearchIndex(models.Model):
+    """SQLite FTS5 index over course titles and descriptions.
+
+    The virtual table and the triggers that keep it in sync with
+    `test_app_course` are created by migration 0008; on PostgreSQL the same
+    migration adds a generated `search_vector` column with a GIN index
+    instead, and this model is not used. See `test_app.search`.
+    """
+    course = models.OneToOneField(Course, primary_key=True, db_column='rowid', related_name='search_index', on_delete=models.DO_NOTHING)
+    title = models.TextField()
+    description = models.TextField()
+    document = SearchDocumentField(db_column='test_app_course_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'test_app_course_fts'
+
+
 class Enrollment(models.Model):
     student = models.ForeignKey(User, limit_choices_to={'role': 'student'}, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     enrolled_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_enrollment'),
+        ]
+        # The enrollment lists page newest first, optionally for one student.
+        indexes = [
+            models.Index(fields=['student', 'enrolled_at'], name='enrollment_student_at_idx'),
+            models.Index(fields=['enrolled_at'], name='enrollment_enrolled_at_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student} enrolled in {self.course}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 class Comment(models.Model):
     course = models.ForeignKey(Course, related_name='comments', on_delete=models.CASCADE)
     student = models.ForeignKey(User, limit_choices_to={'role': 'student'}, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_comment_per_course'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'created_at'], name='comment_course_created_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.student.username} on {self.course.title} at {self.created_at}"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
 
+
+class OutboxEmail(models.Model):
+    """An email queued in the request's transaction and delivered by `test_app.outbox.drain`."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to} ({self.status})"
+
+
+class RevokedToken(models.Model):
+    """A JWT refresh token revoked before it expired (logout or rotation).
+
+    Only refresh requests consult this table; access tokens are verified from
+    their signature and claims alone. Rows are useless once `expires_at` has
+    passed and are purged by `test_app.tokens.revoke`.
+    """
+    jti = models.CharField(max_length=64, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection as db_connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+_executor = None
+
+
+def enqueue(subject, to, html_body='', body=''):
+    """Queue an email; call inside the transaction that makes it necessary."""
+    email = OutboxEmail.objects.create(subject=subject, to=to, body=body, html_body=html_body)
+    if getattr(settings, 'EMAIL_OUTBOX_DRAIN_IN_PROCESS', False):
+        transaction.on_commit(schedule_drain)
+    return email
+
+
+def schedule_drain():
+    """Drain the outbox on a background thread of this process."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-outbox')
+    _executor.submit(_drain_in_thread)
+
+
+def _drain_in_thread():
+    try:
+        drain()
+    finally:
+        db_connection.close()
+
+
+def _claim(batch_size, lease):
+    """Lease due emails to this worker.
+
+    Bumping `next_attempt_at` past the lease hides the rows from other workers
+    without holding a transaction open during SMTP; if this worker dies, the
+    rows become due again once the lease runs out.
+    """
+    now = timezone.now()
+    due = list(
+        OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not due:
+        return []
+    lease_until = now + timedelta(seconds=lease)
+    OutboxEmail.objects.filter(pk__in=due, status='pending', next_attempt_at__lte=now).update(
+        next_attempt_at=lease_until, attempts=F('attempts') + 1,
+    )
+    return list(OutboxEmail.objects.filter(pk__in=due, next_attempt_at=lease_until))
+
+
+def drain(batch_size=None, connection=None):
+    """Send one batch of due emails over a single connection; return (sent, failed)."""
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    backoff = getattr(settings, 'EMAIL_OUTBOX_BACKOFF', 30)
+    lease = getattr(settings, 'EMAIL_OUTBOX_LEASE', 300)
+
+    emails = _claim(batch_size, lease)
+    if not emails:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent, failed = [], []
+    try:
+        connection.open()
+        for email in emails:
+            message = EmailMultiAlternatives(email.subject, email.body, to=[email.to], connection=connection)
+            if email.html_body:
+                message.attach_alternative(email.html_body, 'text/html')
+            try:
+                message.send()
+            except Exception as exc:
+                failed.append((email, exc))
+            else:
+                sent.append(email.pk)
+    except Exception as exc:
+        # Could not connect at all: every unsent email in the batch retries.
+        failed.extend((email, exc) for email in emails if email.pk not in sent)
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    if sent:
+        OutboxEmail.objects.filter(pk__in=sent).update(status='sent', sent_at=now, last_error='')
+    for email, exc in failed:
+        email.last_error = repr(exc)
+        if email.attempts >= max_attempts:
+            email.status = 'failed'
+        else:
+            email.next_attempt_at = now + timedelta(seconds=backoff * 2 ** (email.attempts - 1))
+        email.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+    return len(sent), len(failed)
@@ -0,0 +1,200 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.response import Response
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination returning `{total_count, next, previous, <results_key>}`."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    results_key = 'results'
+    count_total = True
+
+    def get_ordering(self, request, queryset, view):
+        # Follow the view's `?ordering=` choice and keep `id` as the tie-breaker
+        # so the keyset stays stable for duplicate titles/timestamps.
+        ordering = request.query_params.get('ordering')
+        if ordering in getattr(view, 'ordering_fields', []):
+            return (ordering, 'id')
+        # Search results (`test_app.search`) default to best match first.
+        if 'search_rank' in queryset.query.annotations:
+            return ('search_rank', 'id')
+        return self.ordering
+
+    # `CursorPagination.paginate_queryset` split around its queries, so the
+    # async views can run them with `acount()`/`aiterator()` instead.
+
+    def page_queryset(self, queryset, request, view=None):
+        """Return the sliced queryset for this page, or None if pagination is off."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+        self._cursor_state = (offset, reverse, current_position)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + '__lt': current_position}
+            else:
+                kwargs = {order_attr + '__gt': current_position}
+
+            queryset = queryset.filter(**kwargs)
+
+        # One extra row tells us whether a following page exists.
+        return queryset[offset:offset + self.page_size + 1]
+
+    def finish_page(self, results):
+        """Compute the page and its cursors from the rows `page_queryset` selected."""
+        offset, reverse, current_position = self._cursor_state
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        self.total_count = queryset.count() if self.count_total else None
+        return self.finish_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        self.total_count = await queryset.acount() if self.count_total else None
+        return self.finish_page([obj async for obj in page_queryset.aiterator(chunk_size=self.page_size + 1)])
+
+    def get_paginated_data(self, data):
+        return {
+            'total_count': self.total_count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            self.results_key: data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+
+class CourseCursorPagination(KeysetCursorPagination):
+    ordering = ('id',)
+    results_key = 'courses'
+
+
+class EnrollmentCursorPagination(KeysetCursorPagination):
+    """Newest enrollments first; `id` breaks ties between equal timestamps."""
+    ordering = ('-enrolled_at', '-id')
+    results_key = 'enrollments'
+
+
+class CommentCursorPagination(KeysetCursorPagination):
+    """Newest comments first, or only the ones added since the last poll.
+
+    `?after_id=<id>` (or `?since=<ISO 8601 timestamp>`) returns the comments
+    added after that point, oldest first, as `{after_id, has_more, comments}`
+    without counting the total; the next poll passes the returned `after_id`,
+    straight away if `has_more` is set.
+
+    This only misses nothing if comments become visible in id order, which
+    holds on SQLite because it commits one writer at a time. On PostgreSQL
+    ids and `created_at` are assigned before commit, so a transaction that
+    commits late can land below a cursor a client has already moved past.
+    There, poll with `since` set a few seconds before the newest `created_at`
+    seen so far, and drop the comments whose ids the client already has.
+    """
+    ordering = ('-created_at', '-id')
+    results_key = 'comments'
+
+    def get_incremental_filter(self, request):
+        """`(ordering, lookups)` for the incremental mode, or None for cursor pages."""
+        params = request.query_params
+        if 'after_id' in params:
+            try:
+                after_id = int(params['after_id'])
+            except ValueError:
+                raise ValidationError({'after_id': ['A valid integer is required.']})
+            self.after_id = after_id
+            return ('id',), {'id__gt': after_id}
+        if 'since' in params:
+            try:
+                since = parse_datetime(params['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValidationError({'since': ['Datetime has wrong format. Use ISO 8601.']})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            self.after_id = None
+            return ('created_at', 'id'), {'created_at__gt': since}
+        return None
+
+    def page_queryset(self, queryset, request, view=None):
+        self.incremental = self.get_incremental_filter(request)
+        self.count_total = self.incremental is None
+        if self.incremental is None:
+            return super().page_queryset(queryset, request, view)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering, lookups = self.incremental
+        return queryset.filter(**lookups).order_by(*ordering)[:self.page_size + 1]
+
+    def finish_page(self, results):
+        if self.incremental is None:
+            return super().finish_page(results)
+        self.page = list(results[:self.page_size])
+        self.has_more = len(results) > self.page_size
+        if self.page:
+            self.after_id = self.page[-1].pk
+        return self.page
+
+    def get_paginated_data(self, data):
+        if self.incremental is None:
+            return super().get_paginated_data(data)
+        return {'after_id': self.after_id, 'has_more': self.has_more, self.results_key: data}
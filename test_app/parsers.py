@@ -0,0 +1,30 @@
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """`JSONParser` backed by orjson when it is installed.
+
+    orjson always rejects NaN/Infinity, so it is only used in strict mode,
+    which is DRF's default; otherwise the stdlib parser runs. Anything orjson
+    refuses (integers over 64 bits, invalid JSON) is parsed again by the
+    stdlib parser, so results and error messages match `JSONParser`.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        raw = stream.read()
+        try:
+            data = raw
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = raw.decode(encoding)
+            return orjson.loads(data)
+        except ValueError:
+            return super().parse(io.BytesIO(raw), media_type, parser_context)
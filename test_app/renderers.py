@@ -0,0 +1,69 @@
+import math
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # the stdlib path below is used instead
+    orjson = None
+
+# datetimes go through DRF's encoder too: orjson's own format differs ("+00:00" vs "Z").
+_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson is not None else None
+_encode = JSONEncoder().default
+
+
+def _default(obj):
+    value = _encode(obj)
+    if isinstance(value, float) and not math.isfinite(value):
+        raise TypeError('Out of range float values are not JSON compliant')  # e.g. Decimal('NaN')
+    return value
+
+
+def _has_non_finite_float(data):
+    """Whether `data` holds NaN or +/-Infinity, which orjson writes as null."""
+    todo = [data]
+    while todo:
+        value = todo.pop()
+        kind = type(value)
+        if kind is str or kind is int or value is None:
+            continue
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            todo.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            todo.extend(value)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """`JSONRenderer` backed by orjson when it is installed.
+
+    Output is byte-for-byte what the stock renderer produces for compact,
+    non-ASCII-escaped JSON: anything orjson does not encode the way DRF does
+    (Decimal, datetime, date, time, lazy strings, ...) goes through DRF's own
+    `JSONEncoder.default`. Indented output, ASCII-only output, non-strict
+    JSON and values orjson rejects (e.g. integers over 64 bits) fall back to
+    the stdlib renderer, as does output holding NaN or Infinity, which orjson
+    writes as null; the stdlib renderer raises for it in strict mode. Only
+    output containing a null is scanned for them. Floats use orjson's shortest round-trip form, which
+    only differs from `repr()` in exponent notation (1e16 vs 1e+16).
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.ensure_ascii or not self.compact or not self.strict \
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in ret and _has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same strict-javascript-subset escaping as `JSONRenderer.render`.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,49 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Longer queries are cut to this many terms.
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+')
+
+
+def search_terms(query):
+    return _TERM_RE.findall(query)[:MAX_TERMS]
+
+
+def search_courses(queryset, query):
+    """Filter a Course queryset to the courses matching every term of `query`.
+
+    Each term also matches as a prefix ("alg" finds "algebra"). The result is
+    annotated with `search_rank`, where lower is better, so ranked order is
+    `order_by('search_rank', 'id')` on every backend:
+
+    * SQLite: the FTS5 table `test_app_course_fts` (`CourseSearchIndex`),
+      joined on rowid and ranked by bm25.
+    * PostgreSQL: the GIN-indexed `search_vector` column, ranked by ts_rank.
+    * Anything else: `icontains` on title/description, unranked.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(search_index__document__match=match).annotate(search_rank=F('search_index__rank'))
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        table = queryset.model._meta.db_table
+        return queryset.alias(
+            search_match=RawSQL(f'"{table}"."search_vector" @@ to_tsquery(\'english\', %s)', [tsquery], output_field=BooleanField()),
+        ).filter(search_match=True).annotate(
+            search_rank=RawSQL(f'-ts_rank("{table}"."search_vector", to_tsquery(\'english\', %s))', [tsquery], output_field=FloatField()),
+        )
+
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
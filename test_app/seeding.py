@@ -0,0 +1,101 @@
+import random
+
+from django.db import transaction
+
+from .caching import bump
+from .counters import rebuild
+from .models import User, Category, Course, Enrollment, Comment
+
+BATCH_SIZE = 2000
+
+
+def _popularity(count, rng):
+    # Zipf-like weights in random order: a few courses draw most of the enrollments.
+    weights = [1 / (rank + 1) for rank in range(count)]
+    rng.shuffle(weights)
+    return weights
+
+
+def seed(users=1000, categories=10, courses=200, enrollments=5000, comments=1000, prefix='seed', seed=0):
+    """Bulk-create a synthetic school and return the row counts created.
+
+    One user in twenty is a teacher and the rest are students. Courses are
+    spread over the teachers and categories. Enrollments follow a long tail:
+    course popularity and how many courses a student takes are both skewed.
+    Comments come from enrolled students, at most one per student and
+    course as the model requires. Usernames and category names start with
+    `prefix`, so `clear(prefix)` removes everything again. The same `seed`
+    always produces the same data.
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        teacher_count = max(1, users // 20)
+        people = User.objects.bulk_create([
+            User(
+                username=f'{prefix}-{"teacher" if i < teacher_count else "student"}-{i}',
+                email=f'{prefix}-{i}@example.com',
+                first_name=f'First{i}', last_name=f'Last{i}',
+                role='teacher' if i < teacher_count else 'student',
+                is_active=True,
+            )
+            for i in range(users)
+        ], batch_size=BATCH_SIZE)
+        teachers, students = people[:teacher_count], people[teacher_count:]
+
+        groups = Category.objects.bulk_create([
+            Category(name=f'{prefix} category {i}', description=f'Synthetic category {i}')
+            for i in range(categories)
+        ], batch_size=BATCH_SIZE)
+
+        catalogue = Course.objects.bulk_create([
+            Course(
+                title=f'{prefix} course {i}',
+                description=f'Synthetic course {i} about topic {rng.randrange(100)}',
+                teacher=rng.choice(teachers), category=rng.choice(groups),
+                price=f'{rng.randint(0, 200)}.00',
+            )
+            for i in range(courses)
+        ], batch_size=BATCH_SIZE)
+
+        pairs = set()
+        if students and catalogue:
+            enrollments = min(enrollments, len(students) * len(catalogue))
+            popularity = _popularity(len(catalogue), rng)
+            activity = _popularity(len(students), rng)
+            # Near saturation the rare pairs take long to draw, so give up after a while.
+            for _ in range(enrollments // 16 + 1000):
+                if len(pairs) >= enrollments:
+                    break
+                student = rng.choices(range(len(students)), weights=activity, k=256)
+                course = rng.choices(range(len(catalogue)), weights=popularity, k=256)
+                pairs.update(zip(student, course))
+        pairs = list(pairs)
+        rng.shuffle(pairs)
+        pairs = pairs[:enrollments]
+        Enrollment.objects.bulk_create([
+            Enrollment(student=students[student], course=catalogue[course]) for student, course in pairs
+        ], batch_size=BATCH_SIZE)
+
+        Comment.objects.bulk_create([
+            Comment(student=students[student], course=catalogue[course], content=f'Comment {i}')
+            for i, (student, course) in enumerate(pairs[:comments])
+        ], batch_size=BATCH_SIZE)
+
+        # bulk_create skips the signal handlers keeping counters and cached responses current.
+        rebuild()
+        bump('users', 'categories', 'course-list', 'course-refs')
+
+    return {
+        'users': len(people), 'categories': len(groups), 'courses': len(catalogue),
+        'enrollments': len(pairs), 'comments': min(comments, len(pairs)),
+    }
+
+
+def clear(prefix='seed'):
+    """Delete the rows `seed(prefix=prefix)` created; courses, enrollments and comments cascade."""
+    with transaction.atomic():
+        deleted = User.objects.filter(username__startswith=f'{prefix}-').delete()[0]
+        deleted += Category.objects.filter(name__startswith=f'{prefix} ').delete()[0]
+        rebuild()
+        bump('users', 'categories', 'course-list', 'course-refs')
+    return deleted
@@ -1,7 +1,22 @@
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from .models import Enrollment, User, Course, Category, Comment
+from .caching import bump
+from .counters import adjust_bulk
+from .events import publish_on_commit
+from .fast_serializers import FastListSerializer
+from .fieldsets import DynamicFieldsMixin
+from .hashers import offload
+from .instrumentation import ProfiledSerializerMixin
+from .tokens import is_revoked, revoke
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ProfiledSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     confirm_password = serializers.CharField(write_only=True, required=True)
     course_count = serializers.SerializerMethodField()
@@ -13,19 +28,24 @@ class UserSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'course_count': {'read_only': True},
         }
+        list_serializer_class = FastListSerializer
 
     def get_course_count(self, obj):
         if obj.role == 'teacher':
-            return obj.courses_taught.count()
+            return obj.course_count
         return None
 
     def validate(self, data):
         if data['password'] != data['confirm_password']:
             raise serializers.ValidationError("Passwords do not match")
+        # Hash during is_valid(), before any transaction starts, so a
+        # registration never holds the database write lock for the hash.
+        # The async registration view hashes it itself, without blocking a thread.
+        if self.context.get('hash_password', True):
+            data['password'] = offload(make_password, data['password'])
         return data
 
     def create(self, validated_data):
-        print(validated_data)
         user = User(
             email=validated_data['email'],
             username=validated_data['username'],
@@ -36,31 +56,21 @@ class UserSerializer(serializers.ModelSerializer):
             image=validated_data['image']
         )
         
-        user.set_password(validated_data['password'])
+        user.password = validated_data['password']
         user.is_active = False 
         user.save()
         return user
 
-# class CategorySerializer(serializers.ModelSerializer):
-#     course_count = serializers.IntegerField(read_only=True)
-
-#     class Meta:
-#         model = Category
-#         fields = ['id', 'name', 'description', 'course_count']
-
-
-class CategorySerializer(serializers.ModelSerializer):
-    course_count = serializers.SerializerMethodField()
+class CategorySerializer(ProfiledSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    course_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'course_count']
-
-    def get_course_count(self, obj):
-        return obj.course_set.count()
+        list_serializer_class = FastListSerializer
     
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ProfiledSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     student = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(role='student'))
     student_name = serializers.CharField(source='student.username', read_only=True)
     student_image = serializers.CharField(source='student.image', read_only=True)
@@ -68,6 +78,9 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ['id', 'student', 'student_name', 'student_image', 'course', 'content', 'created_at']
+        list_serializer_class = FastListSerializer
+        # The unique_comment_per_course constraint is enforced in `create`.
+        validators = []
 
     def validate(self, attrs):
         student = attrs['student']
@@ -77,18 +90,23 @@ class CommentSerializer(serializers.ModelSerializer):
         if not Enrollment.objects.filter(student=student, course=course).exists():
             raise serializers.ValidationError("You must be enrolled in the course to comment.")
 
-        # Check if the student has already commented on the course
-        if Comment.objects.filter(student=student, course=course).exists():
-            raise serializers.ValidationError("You have already commented on this course.")
-
         return attrs
     
     def create(self, validated_data):
-        return Comment.objects.create(**validated_data)
+        try:
+            return Comment.objects.create(**validated_data)
+        except IntegrityError:
+            # Only a unique_comment_per_course clash is the user's mistake; a
+            # foreign key or NOT NULL failure is re-raised.
+            if not Comment.objects.filter(student=validated_data['student'], course=validated_data['course']).exists():
+                raise
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ["You have already commented on this course."]})
 
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(ProfiledSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('comments', 'students')
+
     teacher = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(role='teacher'), write_only=True)
     teacher_name = serializers.SerializerMethodField(read_only=True)
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
@@ -99,7 +117,9 @@ class CourseSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Course
-        fields = ['id', 'title', 'description', 'teacher', 'teacher_name', 'teacher_image', 'category', 'category_name', 'price', 'created_at', 'comments', 'students']
+        fields = ['id', 'title', 'description', 'teacher', 'teacher_name', 'teacher_image', 'category', 'category_name', 'price', 'created_at', 'enrollment_count', 'comment_count', 'comments', 'students']
+        read_only_fields = ['enrollment_count', 'comment_count']
+        list_serializer_class = FastListSerializer
 
     def get_teacher_name(self, obj):
         return obj.teacher.username if obj.teacher else None
@@ -113,16 +133,15 @@ class CourseSerializer(serializers.ModelSerializer):
     def validate_teacher(self, value):
         request = self.context.get('request')
         user = request.user
-        if value != user:
+        # Compare by pk: under JWT auth `request.user` is built from token claims.
+        if value.pk != user.pk:
             raise serializers.ValidationError("You can only assign yourself as the teacher for this course.")
         return value
 
-    def create(self, validated_data):
-        validated_data['teacher'] = self.context['request'].user
-        return super().create(validated_data)
-
     
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(ProfiledSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('student_info', 'course_info')
+
     student = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(role='student'))
     course = serializers.PrimaryKeyRelatedField(queryset=Course.objects.all())
     student_info = serializers.SerializerMethodField(read_only=True)
@@ -131,6 +150,9 @@ class EnrollmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Enrollment
         fields = ['id', 'student', 'course', 'enrolled_at', 'student_info', 'course_info']
+        list_serializer_class = FastListSerializer
+        # The unique_enrollment constraint is enforced in `create`.
+        validators = []
 
     def get_student_info(self, obj):
         student = obj.student
@@ -154,12 +176,126 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         user = request.user
         if user.role != 'student':
             raise serializers.ValidationError("Only students can enroll in courses.")
-        if attrs['student'] != user:
+        if attrs['student'].pk != user.pk:
             raise serializers.ValidationError("You can only enroll yourself in a course.")
-        if Enrollment.objects.filter(student=user, course=attrs['course']).exists():
-            raise serializers.ValidationError("You are already enrolled in this course.")
         return attrs
 
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            if not Enrollment.objects.filter(student=validated_data['student'], course=validated_data['course']).exists():
+                raise
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ["You are already enrolled in this course."]})
+
+# Stream events carry the enrollment's own fields; clients expand them through the REST API.
+ENROLLMENT_EVENT_SELECTION = {'omit': {'student_info', 'course_info'}}
+
+
+def announce_comment(comment):
+    """Push a new comment to its course's event stream once the transaction commits."""
+    publish_on_commit(comment.course_id, 'comment', f'comment-{comment.pk}', CommentSerializer(comment).data)
+
+
+def announce_enrollment(enrollment):
+    """Push a new enrollment to its course's event stream once the transaction commits."""
+    data = EnrollmentSerializer(enrollment, context={'field_selection': ENROLLMENT_EVENT_SELECTION}).data
+    publish_on_commit(enrollment.course_id, 'enrollment', f'enrollment-{enrollment.pk}', data)
+
+
+class BulkEnrollmentListSerializer(serializers.ListSerializer):
+    """Validate and create a batch of enrollments with a fixed number of queries.
+
+    The rules are the ones `EnrollmentSerializer.validate` applies to a single
+    enrollment; a failing item is reported in its result instead of failing
+    the whole batch.
+    """
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        student_ids = {item['student'] for item in validated_data}
+        course_ids = {item['course'] for item in validated_data}
+
+        students = User.objects.filter(role='student').in_bulk(student_ids)
+        courses = Course.objects.select_related('teacher', 'category').in_bulk(course_ids)
+        enrolled = set(
+            Enrollment.objects.filter(student_id__in=student_ids, course_id__in=course_ids)
+            .values_list('student_id', 'course_id')
+        )
+
+        results = []
+        pending = []
+        for item in validated_data:
+            pair = (item['student'], item['course'])
+            if pair[0] not in students:
+                errors = {'student': [f'Invalid pk "{pair[0]}" - object does not exist.']}
+            elif pair[1] not in courses:
+                errors = {'course': [f'Invalid pk "{pair[1]}" - object does not exist.']}
+            elif pair[0] != user.pk:
+                errors = {'non_field_errors': ['You can only enroll yourself in a course.']}
+            elif pair in enrolled:
+                errors = {'non_field_errors': ['You are already enrolled in this course.']}
+            else:
+                errors = None
+                enrolled.add(pair)
+                enrollment = Enrollment(student=students[pair[0]], course=courses[pair[1]])
+                pending.append(enrollment)
+            results.append({'errors': errors, 'enrollment': None if errors else enrollment})
+
+        if pending:
+            try:
+                with transaction.atomic():
+                    Enrollment.objects.bulk_create(pending)
+                    # bulk_create() sends no post_save, so do the signal handlers' work here.
+                    adjust_bulk(Enrollment, pending)
+                    bump('course-list', *{f'course:{enrollment.course_id}' for enrollment in pending})
+                    for enrollment in pending:
+                        announce_enrollment(enrollment)
+            except IntegrityError:
+                # A concurrent request enrolled some of these pairs first; fall
+                # back to one INSERT per item so only the clashing ones fail.
+                for result in results:
+                    enrollment = result['enrollment']
+                    if enrollment is None:
+                        continue
+                    try:
+                        enrollment.pk = None
+                        enrollment.save()
+                    except IntegrityError:
+                        if not Enrollment.objects.filter(student=enrollment.student, course=enrollment.course).exists():
+                            raise
+                        result['enrollment'] = None
+                        result['errors'] = {'non_field_errors': ['You are already enrolled in this course.']}
+        return results
+
+
+class BulkEnrollmentSerializer(serializers.Serializer):
+    student = serializers.IntegerField()
+    course = serializers.IntegerField()
+
+    class Meta:
+        list_serializer_class = BulkEnrollmentListSerializer
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_revoked(refresh):
+            raise InvalidToken("Token has been revoked.")
+        data = super().validate(attrs)
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            revoke(refresh)
+        # The role claim drives the permission checks, so take it from the row
+        # rather than the old token; a demoted user loses access on refresh.
+        role = User.objects.filter(pk=refresh[jwt_settings.USER_ID_CLAIM]).values_list('role', flat=True).first()
+        for key, token_class in (('access', AccessToken), ('refresh', RefreshToken)):
+            if key in data:
+                token = token_class(data[key])
+                token['role'] = role
+                data[key] = str(token)
+        return data
+
+
 class UserLoginSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True)
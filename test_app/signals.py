@@ -0,0 +1,102 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import User, Category, Course, Enrollment, Comment
+from .authentication import invalidate_token, invalidate_user
+from .caching import bump
+from .counters import adjust, counters_for
+from .serializers import announce_comment, announce_enrollment
+
+
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=Enrollment)
+@receiver(pre_save, sender=Comment)
+def remember_counted_parents(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    fks = [fk for _, fk, _, _ in counters_for(sender)]
+    # Only updates pay for this lookup; it lets post_save move counts when
+    # a row is reassigned to another course, teacher or category.
+    instance._counted_parents = sender.objects.filter(pk=instance.pk).values(*fks).first()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_save, sender=Comment)
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_counted_parents', None)
+    for _, fk, target, field in counters_for(sender):
+        current = getattr(instance, fk)
+        if created:
+            adjust(target, field, current, 1)
+        elif previous is not None and previous[fk] != current:
+            adjust(target, field, previous[fk], -1)
+            adjust(target, field, current, 1)
+    instance._counted_parents = None
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_delete, sender=Comment)
+def decrement_counters(sender, instance, **kwargs):
+    for _, fk, target, field in counters_for(sender):
+        adjust(target, field, getattr(instance, fk), -1)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    bump('categories', 'course-list', 'course-refs')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_responses(sender, instance, update_fields=None, **kwargs):
+    # `login()` saves last_login on every sign-in, which no cached response shows.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump('users', 'course-list', 'course-refs')
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_responses(sender, instance, **kwargs):
+    bump('course-list', f'course:{instance.pk}', 'categories', 'users')
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_course_activity_responses(sender, instance, **kwargs):
+    bump('course-list', f'course:{instance.course_id}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_responses(sender, instance, **kwargs):
+    bump('comments', f'comments:{instance.course_id}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Enrollment)
+def announce_course_activity(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        (announce_comment if sender is Comment else announce_enrollment)(instance)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_changed_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    # Covers deactivation as well as role changes the cached user would miss.
+    invalidate_user(instance.pk)
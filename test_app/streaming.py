@@ -0,0 +1,90 @@
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+from .fast_serializers import compile_representation
+from .renderers import FastJSONRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON: one compact JSON document per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return FastJSONRenderer().render(data) + b'\n'
+
+
+class StreamingListMixin:
+    """Stream list responses row by row instead of building them in memory.
+
+    `?stream=1` streams a JSON array (wrapped as `{"total_count": ..., <key>: [...]}`
+    when `stream_envelope` names the key), and `Accept: application/x-ndjson`,
+    `?format=ndjson` or `?stream=ndjson` stream one object per line. Rows come
+    from `.iterator(chunk_size=...)`, which also runs any prefetches per chunk,
+    so at most one chunk of model instances is alive at a time.
+    """
+    stream_chunk_size = 500
+    stream_envelope = None
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+    def get_stream_format(self):
+        request = self.request
+        if isinstance(getattr(request, 'accepted_renderer', None), NDJSONRenderer):
+            return 'ndjson'
+        stream = request.query_params.get('stream')
+        if stream == 'ndjson':
+            return 'ndjson'
+        if stream in ('1', 'true', 'json'):
+            return 'json'
+        return None
+
+    def get_stream_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format()
+        if stream_format is not None:
+            return self.stream_response(stream_format)
+        return super().list(request, *args, **kwargs)
+
+    def stream_response(self, stream_format):
+        queryset = self.get_stream_queryset()
+        if stream_format == 'ndjson':
+            return StreamingHttpResponse(self.stream_ndjson(queryset), content_type=NDJSONRenderer.media_type)
+        return StreamingHttpResponse(self.stream_json(queryset), content_type='application/json')
+
+    def iter_rendered_rows(self, queryset):
+        to_representation = compile_representation(self.get_serializer())
+        render = FastJSONRenderer().render
+        for obj in queryset.iterator(chunk_size=self.stream_chunk_size):
+            yield render(to_representation(obj))
+
+    def iter_batches(self, rows, separator):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.stream_chunk_size:
+                yield separator.join(batch)
+                batch = []
+        if batch:
+            yield separator.join(batch)
+
+    def stream_ndjson(self, queryset):
+        for batch in self.iter_batches(self.iter_rendered_rows(queryset), b'\n'):
+            yield batch + b'\n'
+
+    def stream_json(self, queryset):
+        if self.stream_envelope:
+            render = FastJSONRenderer().render
+            yield b'{"total_count":' + render(queryset.count()) + b',' + render(self.stream_envelope) + b':['
+        else:
+            yield b'['
+        first = True
+        for batch in self.iter_batches(self.iter_rendered_rows(queryset), b','):
+            yield batch if first else b',' + batch
+            first = False
+        yield b']}' if self.stream_envelope else b']'
@@ -1,3 +1,1281 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import decimal
+import importlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import async_views, events, hashers, outbox, serializers as app_serializers, throttling, urls, views
+from .models import User, Category, Course, Enrollment, Comment, OutboxEmail
+from .authentication import token_cache
+from .benchmarking import BenchmarkFixture, endpoint_requests
+from .counters import verify
+from .fast_serializers import FastListSerializer
+from .hashers import TunablePBKDF2PasswordHasher, offload
+from .instrumentation import RequestProfile, RequestProfilingMiddleware, read_samples
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .seeding import seed
+from . import url_index
+from .tokens import issue_tokens
+from .views import CommentList
+from .serializers import CategorySerializer, CommentSerializer, CourseSerializer, EnrollmentSerializer, UserSerializer
+
+
+class IndexUsageTests(TestCase):
+    """Each endpoint's main query must be answered from an index, not a table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Math', description='Numbers')
+        cls.teacher = User.objects.create(username='teacher', role='teacher', is_active=True)
+        cls.student = User.objects.create(username='student', role='student', is_active=True)
+        cls.courses = [
+            Course.objects.create(title=f'Course {i}', description='', teacher=cls.teacher, category=cls.category, price='10.00')
+            for i in range(3)
+        ]
+        for course in cls.courses:
+            Enrollment.objects.create(student=cls.student, course=course)
+            Comment.objects.create(student=cls.student, course=course, content='Nice')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # The tables are tiny; make sure the planner shows whether an index is usable.
+                cursor.execute('SET enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertMainQueryUsesIndex(self, url, table):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        main = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql'] and 'WHERE' in query['sql']
+        ]
+        self.assertTrue(main, f'No filtered query on {table} for {url}')
+        # Prefer the page query over the COUNT(*) that precedes it.
+        main.sort(key=lambda sql: 'ORDER BY' not in sql)
+        plan = self.query_plan(main[0])
+        if connection.vendor == 'postgresql':
+            self.assertIn('Index', plan, plan)
+        else:
+            self.assertRegex(plan, r'USING (COVERING )?INDEX|USING INTEGER PRIMARY KEY', plan)
+            self.assertNotRegex(plan, rf'^SCAN {table}\b', plan)
+
+    def test_course_list_by_category_ordered_by_created_at(self):
+        self.assertMainQueryUsesIndex(f'/api/courses/?category={self.category.pk}&ordering=created_at', 'test_app_course')
+
+    def test_course_list_by_teacher_ordered_by_created_at(self):
+        self.assertMainQueryUsesIndex(f'/api/courses/?teacher={self.teacher.pk}&ordering=created_at', 'test_app_course')
+
+    def test_comments_by_course(self):
+        self.assertMainQueryUsesIndex(f'/api/comments/?course={self.courses[0].pk}', 'test_app_comment')
+
+    def test_course_list_comments_by_course(self):
+        self.assertMainQueryUsesIndex('/api/courses/', 'test_app_comment')
+
+    def test_teacher_list_by_role(self):
+        self.assertMainQueryUsesIndex('/api/teachers/', 'test_app_user')
+
+    def test_enrollments_by_student(self):
+        self.assertMainQueryUsesIndex(f'/api/enrollments/student/{self.student.pk}/', 'test_app_enrollment')
+
+
+class OutboxTests(TestCase):
+    def register(self):
+        return self.client.post('/api/register/', {
+            'username': 'newbie', 'email': 'newbie@example.com', 'first_name': 'New', 'last_name': 'Bie',
+            'password': 'pass12345', 'confirm_password': 'pass12345', 'role': 'student',
+            'specialization': '', 'image': '',
+        })
+
+    def test_registration_queues_email_without_sending(self):
+        self.register()
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.to, 'newbie@example.com')
+        self.assertIn('/api/active/', email.html_body)
+
+    def test_password_hashed_outside_the_transaction(self):
+        depth = len(connection.atomic_blocks)
+        hashed_at = []
+        def hash_password(password):
+            hashed_at.append(len(connection.atomic_blocks))
+            return make_password(password)
+        with mock.patch('test_app.serializers.make_password', side_effect=hash_password):
+            self.register()
+        self.assertEqual(hashed_at, [depth])
+        user = User.objects.get(username='newbie')
+        self.assertTrue(user.check_password('pass12345'))
+        self.assertFalse(user.is_active)
+
+    def test_drain_sends_batch_over_one_connection(self):
+        for i in range(3):
+            outbox.enqueue('Hello', f'user{i}@example.com', html_body='<p>Hi</p>')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as opened:
+            self.assertEqual(outbox.drain(), (3, 0))
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+
+    def test_failed_send_backs_off_then_gives_up(self):
+        email = outbox.enqueue('Hello', 'user@example.com', body='Hi')
+        with self.settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2), \
+                mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            self.assertEqual(outbox.drain(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertEqual(outbox.drain(), (0, 0))  # not due yet
+
+            OutboxEmail.objects.update(next_attempt_at=email.created_at)
+            self.assertEqual(outbox.drain(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+        self.assertIn('down', email.last_error)
+
+
+class FastListSerializerTests(TestCase):
+    """List reads must render exactly what the stock DRF serializers render."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher', image='https://example.com/t.png')
+        students = [User.objects.create(username=f'student{i}', role='student', email=f's{i}@example.com') for i in range(2)]
+        courses = [
+            Course.objects.create(title='Algebra', description='', teacher=teacher, category=category, price='10.50'),
+            Course.objects.create(title='Orphan', description='', teacher=None, category=category, price='0.00'),
+        ]
+        for course in courses:
+            for student in students:
+                Enrollment.objects.create(student=student, course=course)
+                Comment.objects.create(student=student, course=course, content='Nice')
+
+    def stock(self):
+        # Plain DRF all the way down, nested lists included.
+        return mock.patch.object(FastListSerializer, 'to_representation', serializers.ListSerializer.to_representation)
+
+    def assertRendersLikeDRF(self, serializer_class, queryset):
+        objects = list(queryset)
+        fast = serializer_class(objects, many=True, context={}).data
+        with self.stock():
+            stock = serializer_class(objects, many=True, context={}).data
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(stock))
+
+    def test_every_list_serializer(self):
+        covered = set()
+        for serializer_class in vars(app_serializers).values():
+            meta = getattr(serializer_class, 'Meta', None)
+            if getattr(meta, 'list_serializer_class', None) is FastListSerializer:
+                self.assertRendersLikeDRF(serializer_class, meta.model.objects.all())
+                covered.add(meta.model)
+        self.assertEqual(covered, {User, Category, Course, Enrollment, Comment})
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_list_endpoints(self):
+        # The views' own querysets and field selections, with nested lists and method fields.
+        student = User.objects.filter(role='student').first()
+        course = Course.objects.first()
+        client = APIClient()
+        client.force_authenticate(student)
+        for url in (
+            '/api/users/', '/api/teachers/', '/api/categories/', '/api/courses/', '/api/courses/?expand=comments',
+            '/api/courses/?fields=id,teacher_name,category_name,teacher_image,students', '/api/enrollments/',
+            '/api/enrollments/?omit=course_info', f'/api/enrollments/student/{student.pk}/',
+            f'/api/comments/?course={course.pk}', f'/api/comments/?course={course.pk}&after_id=0',
+        ):
+            fast = client.get(url)
+            with self.stock():
+                stock = client.get(url)
+            self.assertEqual(fast.status_code, 200, url)
+            self.assertEqual(fast.content, stock.content, url)
+
+    def test_users(self):
+        self.assertRendersLikeDRF(UserSerializer, User.objects.all())
+
+    def test_categories(self):
+        self.assertRendersLikeDRF(CategorySerializer, Category.objects.all())
+
+    def test_courses_with_nested_lists(self):
+        self.assertRendersLikeDRF(CourseSerializer, Course.objects.prefetch_related('comments', 'students'))
+        self.assertRendersLikeDRF(CourseSerializer, Course.objects.all())
+
+    def test_enrollments(self):
+        self.assertRendersLikeDRF(EnrollmentSerializer, Enrollment.objects.all())
+
+    def test_comments(self):
+        self.assertRendersLikeDRF(CommentSerializer, Comment.objects.all())
+
+
+class FastJSONRendererTests(TestCase):
+    def test_matches_stock_renderer(self):
+        data = {
+            'price': decimal.Decimal('10.50'),
+            'created_at': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'enrolled_on': datetime.date(2024, 5, 1),
+            'text': 'caf\u00e9 \u2028 "quoted"\n',
+            'nested': [{'id': 1, 'course_count': None}],
+            'huge': 2 ** 70,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_raise_like_the_stock_renderer(self):
+        for value in (float('nan'), float('inf'), -float('inf'), decimal.Decimal('NaN')):
+            data = {'courses': [{'id': 1, 'image': None, 'rank': value}]}
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(data)
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render(data)
+        data = {'rank': 0.5, 'image': None, 'title': 'null'}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_parser_matches_stock_parser(self):
+        for body in (b'{"id": 36893488147419103232}', b'[-36893488147419103232, 1.5, "caf\xc3\xa9"]'):
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        for body in (b'{"id": NaN}', b'{"id": 1,}'):
+            with self.assertRaises(ParseError) as fast:
+                FastJSONParser().parse(io.BytesIO(body))
+            with self.assertRaises(ParseError) as stock:
+                JSONParser().parse(io.BytesIO(body))
+            self.assertEqual(str(fast.exception), str(stock.exception))
+
+    def test_course_list_unchanged(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        category = Category.objects.create(name='Math', description='Numbers')
+        Course.objects.create(title='Algebra', description='', teacher=teacher, category=category, price='10.50')
+        response = APIClient().get('/api/courses/')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+class FieldSelectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        cls.student = User.objects.create(username='student', role='student')
+        for i in range(3):
+            course = Course.objects.create(title=f'Course {i}', description='', teacher=teacher, category=category, price='10.00')
+            Enrollment.objects.create(student=cls.student, course=course)
+            Comment.objects.create(student=cls.student, course=course, content='Nice')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [query['sql'] for query in queries.captured_queries]
+
+    def test_sparse_course_list_skips_joins_and_prefetches(self):
+        data, queries = self.get('/api/courses/?fields=id,title,price')
+        self.assertEqual(set(data['courses'][0]), {'id', 'title', 'price'})
+        self.assertEqual(len(queries), 2)  # COUNT and the page, nothing prefetched
+        self.assertFalse(any('JOIN' in sql for sql in queries))
+
+    def test_expand_and_omit(self):
+        data, queries = self.get('/api/courses/?fields=id&expand=comments')
+        self.assertEqual(set(data['courses'][0]), {'id', 'comments'})
+        self.assertEqual(len(queries), 3)
+
+        data, _ = self.get(f'/api/enrollments/student/{self.student.pk}/?omit=course_info,student_info')
+        self.assertEqual(set(data['enrollments'][0]), {'id', 'student', 'course', 'enrolled_at'})
+
+
+class EnrollmentQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        cls.courses = [
+            Course.objects.create(title=f'Course {i}', description='', teacher=teacher, category=category, price='10.00')
+            for i in range(25)
+        ]
+        cls.one = User.objects.create(username='one', role='student')
+        cls.many = User.objects.create(username='many', role='student')
+        Enrollment.objects.create(student=cls.one, course=cls.courses[0])
+        for course in cls.courses:
+            Enrollment.objects.create(student=cls.many, course=course)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.one)
+
+    def test_by_student_is_constant(self):
+        for student, total in [(self.one, 1), (self.many, 25)]:
+            with self.assertNumQueries(3):  # the student, COUNT and the page
+                data = self.client.get(f'/api/enrollments/student/{student.pk}/').json()
+            self.assertEqual(data['total_count'], total)
+            self.assertEqual(data['enrollments'][0]['student'], student.pk)
+
+    def test_list_pages_newest_first(self):
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/enrollments/', {'page_size': 20}).json()
+        self.assertEqual(data['total_count'], 26)
+        seen = [row['id'] for row in data['enrollments']]
+        data = self.client.get(data['next']).json()
+        seen += [row['id'] for row in data['enrollments']]
+        self.assertEqual(seen, sorted(Enrollment.objects.values_list('id', flat=True), reverse=True))
+
+
+class CourseSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Math', description='Numbers')
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        for title, description in [
+            ('Intro to Algebra', 'Equations'),
+            ('Geometry', 'Shapes, with a little algebra'),
+            ('Cooking', 'Recipes'),
+        ]:
+            Course.objects.create(title=title, description=description, teacher=cls.teacher, category=cls.category, price='10.00')
+
+    def search(self, query):
+        cache.clear()  # response cache versions only move on commit
+        response = APIClient().get('/api/courses/', {'q': query, 'fields': 'title'})
+        self.assertEqual(response.status_code, 200)
+        return [course['title'] for course in response.json()['courses']]
+
+    def test_ranked_prefix_search(self):
+        self.assertEqual(self.search('algebra'), ['Intro to Algebra', 'Geometry'])
+        self.assertEqual(self.search('alg'), ['Intro to Algebra', 'Geometry'])
+        self.assertEqual(self.search('cook rec'), ['Cooking'])
+        self.assertEqual(self.search('"*'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        course = Course.objects.get(title='Cooking')
+        course.title = 'Baking'
+        course.save()
+        self.assertEqual(self.search('baking'), ['Baking'])
+        self.assertEqual(self.search('cooking'), [])
+        course.delete()
+        self.assertEqual(self.search('baking'), [])
+
+
+class RequestProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        Course.objects.create(title='Algebra', description='', teacher=teacher, category=category, price='10.00')
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = os.path.join(directory.name, 'profile.jsonl')
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', APIClient().get('/api/courses/'))
+
+    def test_server_timing_and_report(self):
+        with override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_LOG=self.log):
+            client = APIClient()
+            response = client.get('/api/courses/')
+            client.get('/api/categories/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="4 queries", serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=')
+
+        out = io.StringIO()
+        call_command('profiling_report', log=self.log, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report), {'course-list', 'category-list'})
+        self.assertEqual(report['course-list']['requests'], 1)
+        self.assertEqual(report['course-list']['queries_max'], 4)  # COUNT, page and two prefetches
+
+    async def test_async_requests(self):
+        async def get_response(request):
+            return HttpResponse()
+        with override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_LOG=self.log, RESPONSE_CACHE_TIMEOUT=0):
+            # Built on the thread that owns the test database connection, which it hooks.
+            middleware = await sync_to_async(RequestProfilingMiddleware)(get_response)
+            self.assertTrue(iscoroutinefunction(middleware))
+            response = await AsyncClient().get('/api/courses/')
+            pattern = next(pattern for pattern in urls.urlpatterns if pattern.name == 'course-list')
+            with mock.patch.object(pattern, 'callback', async_views.AsyncCourseList.as_view()):
+                async_response = await AsyncClient().get('/api/courses/')
+        for response in (response, async_response):
+            self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="4 queries", serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=')
+        self.assertEqual(len(read_samples(self.log)), 2)
+
+    def test_repeated_statements_are_grouped(self):
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile):
+            for course in Course.objects.all():
+                for _ in range(5):
+                    User.objects.filter(pk=course.teacher_id).exists()
+        repeated = profile.repeated_queries(5)
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0][0], 5)
+        self.assertIn('test_app_user', repeated[0][1])
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class EndpointQueryCountTests(TestCase):
+    """Every read endpoint runs as many queries over a large dataset as over a small one."""
+
+    def query_counts(self):
+        fixture = BenchmarkFixture()
+        counts = {}
+        for spec in endpoint_requests(fixture):
+            if spec['method'] != 'GET':
+                continue
+            headers = fixture.headers(spec['auth'])
+            self.client.get(spec['path'], **headers)  # warm the token -> user cache
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(spec['path'], **headers)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, spec['name'])
+            counts[spec['name']] = len(queries)
+        return counts
+
+    def test_no_n_plus_one(self):
+        seed(users=40, courses=5, enrollments=30, comments=10, prefix='small')
+        small = self.query_counts()
+        seed(users=400, courses=60, enrollments=2000, comments=500, prefix='large', seed=1)
+        self.assertEqual(self.query_counts(), small)
+
+
+class URLIndexTests(TestCase):
+    def test_html_and_json(self):
+        html = self.client.get('/').content.decode()
+        self.assertIn('<a href="http://testserver/api/courses/">course-list</a>', html)
+        self.assertIn('course-detail (URL requires parameters: <code>http://testserver/api/courses/&lt;int:pk&gt;/</code>)', html)
+
+        urls = {entry['name']: entry for entry in self.client.get('/api/?format=json').json()['urls']}
+        self.assertEqual(urls['activate']['parameters'], {'uid64': 'str', 'token': 'str'})
+        self.assertIsNone(urls['activate']['url'])
+        self.assertEqual(urls['user-list']['url'], 'http://testserver/api/users/')
+
+    def test_etag_and_rebuild(self):
+        response = self.client.get('/')
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        index = url_index._index
+        self.client.get('/')
+        self.assertIs(url_index._index, index)
+        clear_url_caches()
+        self.client.get('/')
+        self.assertIsNot(url_index._index, index)
+
+
+class CommentFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        cls.course, other = [
+            Course.objects.create(title=f'Course {i}', description='', teacher=teacher, category=category, price='10.00')
+            for i in range(2)
+        ]
+        cls.students = [User.objects.create(username=f'student{i}', role='student') for i in range(6)]
+        for student in cls.students:
+            Enrollment.objects.create(student=student, course=cls.course)
+            Enrollment.objects.create(student=student, course=other)
+        cls.comments = [Comment.objects.create(student=student, course=cls.course, content='Hi') for student in cls.students[:5]]
+        Comment.objects.create(student=cls.students[0], course=other, content='Elsewhere')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_course_pages_newest_first(self):
+        with self.assertNumQueries(2):  # COUNT and the page, students joined
+            data = self.client.get('/api/comments/', {'course': self.course.pk, 'page_size': 3}).json()
+        self.assertEqual(data['total_count'], 5)
+        ids = [comment['id'] for comment in data['comments']]
+        ids += [comment['id'] for comment in self.client.get(data['next']).json()['comments']]
+        self.assertEqual(ids, [comment.pk for comment in reversed(self.comments)])
+
+    def test_polling(self):
+        url = f'/api/comments/?course={self.course.pk}&after_id={self.comments[2].pk}'
+        response = self.client.get(url)
+        data = response.json()
+        self.assertEqual([comment['id'] for comment in data['comments']], [self.comments[3].pk, self.comments[4].pk])
+        self.assertEqual((data['after_id'], data['has_more']), (self.comments[4].pk, False))
+
+        url = f'/api/comments/?course={self.course.pk}&after_id={data["after_id"]}'
+        response = self.client.get(url)
+        self.assertEqual(response.json()['comments'], [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new = Comment.objects.create(student=self.students[5], course=self.course, content='New')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([comment['id'] for comment in response.json()['comments']], [new.pk])
+
+    def test_streams_follow_the_feed(self):
+        def streamed(query):
+            response = self.client.get(f'/api/comments/?course={self.course.pk}&stream=ndjson&{query}')
+            return [json.loads(line)['id'] for line in b''.join(response.streaming_content).splitlines()]
+
+        self.assertEqual(streamed(''), [comment.pk for comment in reversed(self.comments)])
+        self.assertEqual(streamed(f'after_id={self.comments[2].pk}'), [self.comments[3].pk, self.comments[4].pk])
+        since = self.comments[3].created_at.isoformat()
+        self.assertEqual(streamed(f'since={since.replace("+", "%2B")}'), [self.comments[4].pk])
+        response = self.client.get('/api/comments/?stream=1&after_id=x')
+        self.assertEqual(response.status_code, 400)
+
+
+class CourseEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        cls.course = Course.objects.create(title='Algebra', description='', teacher=teacher, category=category, price='10.00')
+        cls.student = User.objects.create(username='student', role='student', is_active=True)
+        cls.token = Token.objects.create(user=cls.student)
+
+    def get_events(self, course_id):
+        # AsyncClient(headers=...) does not reach the ASGI scope; pass them per request.
+        return AsyncClient().get(f'/api/courses/{course_id}/events/', headers={'Authorization': f'Token {self.token.key}'})
+
+    def create_activity(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+            comment = Comment.objects.create(student=self.student, course=self.course, content='Hi')
+        return enrollment, comment
+
+    async def test_stream(self):
+        response = await self.get_events(self.course.pk)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = aiter(response.streaming_content)
+        self.assertEqual(await anext(frames), b'retry: 3000\n\n')
+
+        enrollment, comment = await sync_to_async(self.create_activity)()
+        frame = await asyncio.wait_for(anext(frames), 1)
+        self.assertTrue(frame.startswith(b'id: enrollment-%d\nevent: enrollment\ndata: ' % enrollment.pk))
+        self.assertEqual(json.loads(frame.split(b'data: ')[1])['student'], self.student.pk)
+        frame = await asyncio.wait_for(anext(frames), 1)
+        self.assertEqual(json.loads(frame.split(b'data: ')[1]), CommentSerializer(comment).data)
+
+        # A client disconnecting cancels the pending read, which ends the subscription.
+        read = asyncio.ensure_future(anext(frames))
+        await asyncio.sleep(0)
+        read.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await read
+        self.assertEqual(events.hub.subscriber_count(events.course_channel(self.course.pk)), 0)
+
+    async def test_slow_consumer_policies(self):
+        dropping = events.hub.subscribe('test', maxsize=2)
+        disconnecting = events.hub.subscribe('test', maxsize=2, policy='disconnect')
+        for message in (b'1', b'2', b'3'):
+            events.hub.publish('test', message)
+        await asyncio.sleep(0)
+        self.assertEqual([await dropping.get(1), await dropping.get(1)], [b'2', b'3'])
+        self.assertEqual(dropping.dropped, 1)
+        self.assertEqual(await disconnecting.get(1), b'2')
+        self.assertIs(await disconnecting.get(1), events.CLOSED)
+        self.assertEqual(events.hub.subscriber_count('test'), 1)
+        dropping.close()
+
+    async def test_datagram_broker(self):
+        with tempfile.TemporaryDirectory() as path:
+            broker = events.DatagramBroker(path)
+            broker.start()
+            subscription = events.hub.subscribe('test')
+            try:
+                broker.publish('test', b'data: {}\n\n')
+                self.assertEqual(await subscription.get(1), b'data: {}\n\n')
+            finally:
+                subscription.close()
+
+    async def test_requires_authentication(self):
+        url = f'/api/courses/{self.course.pk}/events/'
+        for headers in ({}, {'Authorization': 'Token bogus'}):
+            response = await AsyncClient().get(url, headers={**headers, 'Accept': 'text/event-stream'})
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(events.hub.subscriber_count(events.course_channel(self.course.pk)), 0)
+        response = await self.get_events(999999)
+        self.assertEqual(response.status_code, 404)
+
+    def test_requires_asgi(self):
+        self.assertEqual(self.client.get(f'/api/courses/{self.course.pk}/events/').status_code, 501)
+
+    def test_oversized_event_carries_only_the_id(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+        with mock.patch.object(events.LocalBroker, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(student=self.student, course=self.course, content='x' * 300_000)
+        frame = publish.call_args.args[1]
+        self.assertEqual(json.loads(frame.split(b'data: ')[1]), {'id': comment.pk, 'partial': True})
+
+    async def test_datagram_broker_size_limits_and_failures(self):
+        with tempfile.TemporaryDirectory() as path:
+            broker = events.DatagramBroker(path)
+            broker.max_size = 1024
+            broker.start()
+            subscription = events.hub.subscribe('test')
+            try:
+                with self.assertLogs('test_app.events', 'WARNING'):
+                    broker.publish('test', b'x' * 2048)
+                # A packet the receiver would have to cut short is dropped, not delivered corrupt.
+                sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                with self.assertLogs('test_app.events', 'WARNING'):
+                    sender.sendto(b'test\n' + b'x' * 2048, broker.address)
+                    self.assertIsNone(await subscription.get(0.2))
+                sender.close()
+                broker.publish('test', b'data: {}\n\n')
+                self.assertEqual(await subscription.get(1), b'data: {}\n\n')
+
+                with mock.patch.object(broker, '_sender') as failing, self.assertLogs('test_app.events', 'ERROR'):
+                    failing.sendto.side_effect = OSError(90, 'Message too long')
+                    broker.publish('test', b'data: {}\n\n')
+            finally:
+                subscription.close()
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [Category.objects.create(name=f'Category {i}', description='') for i in range(2)]
+        cls.teachers = [User.objects.create(username=f'teacher{i}', role='teacher') for i in range(2)]
+        cls.students = [User.objects.create(username=f'student{i}', role='student') for i in range(2)]
+        cls.courses = [
+            Course.objects.create(title=f'Course {i}', description='', teacher=cls.teachers[0], category=cls.categories[0], price='10.00')
+            for i in range(2)
+        ]
+
+    def assertCounts(self, obj, **expected):
+        obj.refresh_from_db()
+        self.assertEqual({field: getattr(obj, field) for field in expected}, expected)
+
+    def test_create_and_delete(self):
+        course = self.courses[0]
+        enrollment = Enrollment.objects.create(student=self.students[0], course=course)
+        comment = Comment.objects.create(student=self.students[0], course=course, content='Hi')
+        self.assertCounts(course, enrollment_count=1, comment_count=1)
+        self.assertCounts(self.teachers[0], course_count=2)
+        self.assertCounts(self.categories[0], course_count=2)
+
+        enrollment.delete()
+        comment.delete()
+        self.assertCounts(course, enrollment_count=0, comment_count=0)
+        self.assertEqual(verify(), [])
+
+    def test_reassignment_moves_counts(self):
+        enrollment = Enrollment.objects.create(student=self.students[0], course=self.courses[0])
+        comment = Comment.objects.create(student=self.students[0], course=self.courses[0], content='Hi')
+        enrollment.course = comment.course = self.courses[1]
+        enrollment.save()
+        comment.save()
+        self.assertCounts(self.courses[0], enrollment_count=0, comment_count=0)
+        self.assertCounts(self.courses[1], enrollment_count=1, comment_count=1)
+
+        course = self.courses[0]
+        course.teacher, course.category = self.teachers[1], self.categories[1]
+        course.save()
+        self.assertCounts(self.teachers[0], course_count=1)
+        self.assertCounts(self.teachers[1], course_count=1)
+        self.assertCounts(self.categories[0], course_count=1)
+        self.assertCounts(self.categories[1], course_count=1)
+        self.assertEqual(verify(), [])
+
+    def test_cascade_delete(self):
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.courses[1])
+            Comment.objects.create(student=student, course=self.courses[1], content='Hi')
+        self.students[0].delete()
+        self.assertCounts(self.courses[1], enrollment_count=1, comment_count=1)
+
+        # Deleting the teacher takes their courses with it.
+        self.teachers[0].delete()
+        self.assertCounts(self.categories[0], course_count=0)
+        self.assertEqual(verify(), [])
+
+    def test_rebuild_counters_check_detects_drift(self):
+        Course.objects.filter(pk=self.courses[0].pk).update(enrollment_count=7)
+        with self.assertRaisesMessage(CommandError, '1 counter(s) out of sync.'):
+            call_command('rebuild_counters', '--check', stdout=io.StringIO())
+
+        call_command('rebuild_counters', stdout=io.StringIO())
+        self.assertCounts(self.courses[0], enrollment_count=0)
+        call_command('rebuild_counters', '--check', stdout=io.StringIO())
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        cls.student = User.objects.create(username='student', role='student')
+        cls.courses = [
+            Course.objects.create(title=f'Course {i}', description='', teacher=teacher, category=category, price='10.00')
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def assertCached(self, url):
+        """Fetch `url` twice; the second response must come from the cache."""
+        data = self.client.get(url).json()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json(), data)
+        return data
+
+    def test_etag_round_trip(self):
+        response = self.client.get('/api/categories/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Art', description='')
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_enrollment_invalidates_course_list(self):
+        data = self.assertCached('/api/courses/')
+        self.assertEqual([course['enrollment_count'] for course in data['courses']], [0, 0])
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student, course=self.courses[0])
+        data = self.assertCached('/api/courses/')
+        self.assertEqual([course['enrollment_count'] for course in data['courses']], [1, 0])
+
+    def test_role_change_invalidates_user_lists(self):
+        self.assertCached('/api/users/')
+        self.assertEqual(len(self.assertCached('/api/teachers/')), 1)
+        self.student.role = 'teacher'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.save()
+        roles = {user['username']: user['role'] for user in self.assertCached('/api/users/')}
+        self.assertEqual(roles['student'], 'teacher')
+        self.assertEqual(len(self.assertCached('/api/teachers/')), 2)
+
+    def test_comments_invalidate_their_course_only(self):
+        Enrollment.objects.create(student=self.student, course=self.courses[0])
+        Enrollment.objects.create(student=self.student, course=self.courses[1])
+        url = f'/api/comments/?course={self.courses[0].pk}'
+        self.assertCached(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(student=self.student, course=self.courses[1], content='Elsewhere')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()['comments'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(student=self.student, course=self.courses[0], content='Here')
+        self.assertEqual(len(self.assertCached(url)['comments']), 1)
+
+
+class BulkEnrollmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        cls.students = [User.objects.create(username=f'student{i}', role='student') for i in range(2)]
+        cls.courses = [
+            Course.objects.create(title=f'Course {i}', description='', teacher=teacher, category=category, price='10.00')
+            for i in range(10)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def enroll(self, student, course_ids, student_id=None):
+        client = APIClient()
+        client.force_authenticate(student)
+        payload = [{'student': student_id or student.pk, 'course': course_id} for course_id in course_ids]
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.post('/api/enrollments/bulk/', payload, format='json')
+
+    def test_per_item_errors(self):
+        student, other = self.students
+        Enrollment.objects.create(student=student, course=self.courses[0])
+        response = self.enroll(student, [self.courses[0].pk, self.courses[1].pk, self.courses[1].pk, 999999])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created_count'], 1)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['error', 'created', 'error', 'error'])
+        self.assertEqual(results[0]['errors'], {'non_field_errors': ['You are already enrolled in this course.']})
+        self.assertEqual(results[2]['errors'], {'non_field_errors': ['You are already enrolled in this course.']})
+        self.assertEqual(results[3]['errors'], {'course': ['Invalid pk "999999" - object does not exist.']})
+
+        response = self.enroll(student, [self.courses[2].pk], student_id=other.pk)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['results'][0]['errors'], {'non_field_errors': ['You can only enroll yourself in a course.']})
+
+    def test_side_effects_of_bulk_create(self):
+        course = self.courses[0]
+        self.client.get('/api/courses/')
+        with mock.patch.object(events.LocalBroker, 'publish') as publish:
+            response = self.enroll(self.students[0], [course.pk, self.courses[1].pk])
+        self.assertEqual(response.status_code, 201)
+        course.refresh_from_db()
+        self.assertEqual(course.enrollment_count, 1)
+        self.assertEqual(verify(), [])
+        self.assertEqual(self.client.get('/api/courses/').json()['courses'][0]['enrollment_count'], 1)
+        channels = [call.args[0] for call in publish.call_args_list]
+        self.assertEqual(channels, [events.course_channel(course.pk), events.course_channel(self.courses[1].pk)])
+
+    def test_integrity_error_falls_back_to_single_inserts(self):
+        student = self.students[0]
+        Enrollment.objects.create(student=student, course=self.courses[1])
+        # Hide the existing enrollment from the pre-check, as a concurrent request would.
+        precheck, real_filter = [Enrollment.objects.none()], Enrollment.objects.filter
+        def filter(*args, **kwargs):
+            return precheck.pop() if precheck else real_filter(*args, **kwargs)
+        with mock.patch.object(Enrollment.objects, 'filter', side_effect=filter):
+            response = self.enroll(student, [self.courses[0].pk, self.courses[1].pk])
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'error'])
+        self.assertEqual(results[1]['errors'], {'non_field_errors': ['You are already enrolled in this course.']})
+        self.assertEqual(Enrollment.objects.filter(student=student).count(), 2)
+        self.assertEqual(verify(), [])
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        counts = []
+        for student, courses in zip(self.students, (self.courses[:2], self.courses[2:])):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.enroll(student, [course.pk for course in courses])
+            self.assertEqual(response.json()['created_count'], len(courses))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class UniquenessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        cls.student = User.objects.create(username='student', role='student')
+        cls.course = Course.objects.create(title='Algebra', description='', teacher=teacher, category=category, price='10.00')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_duplicate_enrollment(self):
+        payload = {'student': self.student.pk, 'course': self.course.pk}
+        self.assertEqual(self.client.post('/api/enrollments/', payload, format='json').status_code, 201)
+        response = self.client.post('/api/enrollments/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': ['You are already enrolled in this course.']})
+
+    def test_duplicate_comment(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+        payload = {'student': self.student.pk, 'course': self.course.pk, 'content': 'Hi'}
+        self.assertEqual(self.client.post('/api/comments/', payload, format='json').status_code, 201)
+        response = self.client.post('/api/comments/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': ['You have already commented on this course.']})
+
+    def test_other_integrity_errors_propagate(self):
+        # E.g. the course was deleted between validation and the INSERT.
+        failure = IntegrityError('FOREIGN KEY constraint failed')
+        serializer = CommentSerializer()
+        with mock.patch.object(Comment.objects, 'create', side_effect=failure):
+            with self.assertRaises(IntegrityError):
+                serializer.create({'student': self.student, 'course': self.course, 'content': 'Hi'})
+        serializer = EnrollmentSerializer()
+        with mock.patch.object(Enrollment.objects, 'create', side_effect=failure):
+            with self.assertRaises(IntegrityError):
+                serializer.create({'student': self.student, 'course': self.course})
+
+
+class TokenAuthCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        cls.courses = [
+            Course.objects.create(title=f'Course {i}', description='', teacher=teacher, category=category, price='10.00')
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        token_cache.clear()
+        self.student = User.objects.create(username='student', role='student', is_active=True)
+        self.token = Token.objects.create(user=self.student)
+        self.client = APIClient(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_the_token_lookup(self):
+        self.assertEqual(self.client.get('/api/enrollments/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/enrollments/').status_code, 200)
+        self.assertFalse([query for query in queries.captured_queries if 'authtoken_token' in query['sql']])
+
+    def test_logout_and_token_delete_reject_the_token(self):
+        self.client.get('/api/enrollments/')
+        self.assertEqual(self.client.post('/api/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/enrollments/').status_code, 401)
+
+        token = Token.objects.create(user=self.student)
+        client = APIClient(HTTP_AUTHORIZATION=f'Token {token.key}')
+        client.get('/api/enrollments/')
+        token.delete()
+        self.assertEqual(client.get('/api/enrollments/').status_code, 401)
+
+    def test_deactivation_rejects_the_token(self):
+        self.client.get('/api/enrollments/')
+        self.student.is_active = False
+        self.student.save()
+        self.assertEqual(self.client.get('/api/enrollments/').status_code, 401)
+
+    def test_role_change_is_seen_at_once(self):
+        enroll = lambda course: self.client.post('/api/enrollments/bulk/', [{'student': self.student.pk, 'course': course.pk}], format='json')
+        self.assertEqual(enroll(self.courses[0]).status_code, 201)
+        self.student.role = 'teacher'
+        self.student.save()
+        response = enroll(self.courses[1])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'detail': 'Only students can enroll in courses.'})
+
+
+@override_settings(AUTH_MODE='jwt')
+class JWTAuthTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Math', description='Numbers')
+        cls.teacher = User.objects.create(username='teacher', role='teacher', is_active=True)
+        cls.student = User.objects.create(username='student', role='student', is_active=True)
+        cls.student.set_password('pass12345')
+        cls.student.save()
+
+    def setUp(self):
+        cache.clear()
+        # Views read DEFAULT_AUTHENTICATION_CLASSES when they are defined; swap in the JWT mode's.
+        patcher = mock.patch.object(APIView, 'authentication_classes', [JWTStatelessUserAuthentication])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def client_for(self, access):
+        return APIClient(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def create_course(self, user, access=None):
+        client = self.client_for(access or issue_tokens(user)['access'])
+        return client.post('/api/courses/create/', {
+            'title': 'Algebra', 'description': 'Basics', 'teacher': user.pk, 'category': self.category.pk, 'price': '10.00',
+        }, format='json')
+
+    def test_role_checks_use_the_claims(self):
+        self.assertEqual(self.create_course(self.teacher).status_code, 201)
+        # The role comes from the token, not from the row, until the token is refreshed.
+        access = issue_tokens(self.student)['access']
+        User.objects.filter(pk=self.student.pk).update(role='teacher')
+        response = self.create_course(self.student, access)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'detail': 'Only teachers can create courses.'})
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        tokens = self.client.post('/api/login/', {'username': 'student', 'password': 'pass12345'}).json()
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('refresh', response.json())
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+
+    def test_refresh_picks_up_a_role_change(self):
+        tokens = issue_tokens(self.student)
+        User.objects.filter(pk=self.student.pk).update(role='teacher')
+        refreshed = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}).json()
+        self.assertEqual(AccessToken(refreshed['access'])['role'], 'teacher')
+        self.assertEqual(RefreshToken(refreshed['refresh'])['role'], 'teacher')
+        self.assertEqual(self.create_course(self.student, refreshed['access']).status_code, 201)
+
+    def test_logout_revokes_the_refresh_token(self):
+        tokens = issue_tokens(self.student)
+        response = self.client_for(tokens['access']).post('/api/logout/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+
+
+    def test_logout_rejects_a_body_that_is_not_an_object(self):
+        client = self.client_for(issue_tokens(self.student)['access'])
+        for body in (['refresh'], 'refresh', 1):
+            response = client.post('/api/logout/', json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+class LoginHardeningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='student', role='student', is_active=True)
+        cls.user.set_password('pass12345')
+        cls.user.save()
+
+    def setUp(self):
+        throttling._backend = None
+        self.addCleanup(setattr, throttling, '_backend', None)
+
+    def login(self, username, address='127.0.0.1', password='wrong'):
+        return self.client.post('/api/login/', {'username': username, 'password': password}, REMOTE_ADDR=address)
+
+    @override_settings(LOGIN_RATE_LIMIT={**settings.LOGIN_RATE_LIMIT, 'IP_ATTEMPTS': 100, 'USERNAME_ATTEMPTS': 2})
+    def test_attempts_per_username_are_limited_across_addresses(self):
+        self.assertEqual(self.login('Student', '10.0.0.1').status_code, 200)
+        self.assertEqual(self.login('student ', '10.0.0.2').status_code, 200)
+        response = self.login('student', '10.0.0.3')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.login('someone-else', '10.0.0.3').status_code, 200)
+
+    def test_non_object_body_gets_a_validation_response(self):
+        for body in ([{'username': 'student'}], 'student'):
+            response = self.client.post('/api/login/', json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 200, body)
+            self.assertIn('non_field_errors', response.json())
+
+    def test_login_upgrades_the_hash_to_the_configured_cost(self):
+        hasher = get_hasher('default')
+        self.assertIsInstance(hasher, TunablePBKDF2PasswordHasher)
+        self.user.password = hasher.encode('pass12345', hasher.salt(), iterations=1000)
+        self.user.save()
+        self.assertIn('token', self.login('student', password='pass12345').json())
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith(f'{hasher.algorithm}${hasher.iterations}$'))
+
+    def test_offload(self):
+        self.assertEqual(offload(lambda: threading.current_thread().name), threading.current_thread().name)
+
+        running, peak, lock = [0], [0], threading.Lock()
+        def work():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return threading.current_thread().name
+
+        with override_settings(PASSWORD_HASHING_OFFLOAD=True, PASSWORD_HASHING_WORKERS=2), \
+                mock.patch.object(hashers, '_executor', None):
+            names = []
+            callers = [threading.Thread(target=lambda: names.append(offload(work))) for _ in range(4)]
+            for caller in callers:
+                caller.start()
+            for caller in callers:
+                caller.join()
+            hashers._executor.shutdown()
+        self.assertEqual(len(names), 4)
+        self.assertTrue(all(name.startswith('password-hashing') for name in names))
+        self.assertEqual(peak[0], 2)
+
+
+class AsyncHashingViewTests(TransactionTestCase):
+    """With PASSWORD_HASHING_OFFLOAD, login and registration await the hashing pool."""
+
+    def setUp(self):
+        cache.clear()
+        throttling._backend = None
+        self.addCleanup(setattr, throttling, '_backend', None)
+        patcher = mock.patch.object(hashers, '_executor', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: hashers._executor and hashers._executor.shutdown())
+        offloading = override_settings(PASSWORD_HASHING_OFFLOAD=True)
+        offloading.enable()
+        self.addCleanup(self.reload_urls)
+        self.addCleanup(offloading.disable)
+        self.reload_urls()
+
+    def reload_urls(self):
+        importlib.reload(urls)
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))  # its include()s hold the old patterns
+        clear_url_caches()
+
+    async def test_hashing_does_not_block_a_request_thread(self):
+        run_in_pool, threads = hashers._run_in_pool, []
+        def record(func, *args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return run_in_pool(func, *args, **kwargs)
+
+        blocking = mock.Mock(side_effect=AssertionError('offload() blocks the calling thread'))
+        with mock.patch.object(hashers, '_run_in_pool', record), \
+                mock.patch.object(views, 'offload', blocking), mock.patch.object(app_serializers, 'offload', blocking):
+            response = await self.async_client.post('/api/register/', {
+                'username': 'newbie', 'email': 'newbie@example.com', 'first_name': 'New', 'last_name': 'Bie',
+                'password': 'pass12345', 'confirm_password': 'pass12345', 'role': 'student',
+                'specialization': '', 'image': '',
+            }, content_type='application/json')
+            self.assertIn('credentials', response.json())
+            await User.objects.filter(username='newbie').aupdate(is_active=True)
+
+            credentials = {'username': 'newbie', 'password': 'pass12345'}
+            response = await self.async_client.post('/api/login/', credentials, content_type='application/json')
+            self.assertIn('token', response.json())
+            response = await self.async_client.post('/api/login/', {**credentials, 'password': 'wrong'}, content_type='application/json')
+            self.assertEqual(response.json(), {'error': 'Invalid username or password'})
+            response = await self.async_client.post('/api/login/', {'username': 'newbie'}, content_type='application/json')
+            self.assertEqual(response.json(), {'password': ['This field is required.']})
+
+        self.assertEqual(len(threads), 3)
+        self.assertTrue(all(name.startswith('password-hashing') for name in threads))
+
+class AsyncListViewTests(TestCase):
+    """The async GET variants must answer exactly like the DRF views they wrap."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        cls.student = User.objects.create(username='student', role='student')
+        cls.course = Course.objects.create(title='Algebra', description='', teacher=teacher, category=category, price='10.00')
+        Enrollment.objects.create(student=cls.student, course=cls.course)
+        Comment.objects.create(student=cls.student, course=cls.course, content='Nice')
+
+    def setUp(self):
+        cache.clear()
+
+    async def assertSameResponse(self, async_view, path, headers=None, **kwargs):
+        request = RequestFactory().get(path, headers=headers)
+        expected = await sync_to_async(lambda: async_view.view_class.as_view()(request, **kwargs).render())()
+        await sync_to_async(cache.clear)()
+        response = await async_view.as_view()(AsyncRequestFactory().get(path, headers=headers), **kwargs)
+        self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content), path)
+        self.assertEqual(response.get('ETag') is None, expected.get('ETag') is None)
+        return response
+
+    async def test_success(self):
+        await self.assertSameResponse(async_views.AsyncCourseList, '/api/courses/')
+        await self.assertSameResponse(async_views.AsyncCategoryList, '/api/categories/')
+        await self.assertSameResponse(async_views.AsyncTeacherList, '/api/teachers/')
+        await self.assertSameResponse(async_views.AsyncCommentList, f'/api/comments/?course={self.course.pk}')
+        await self.assertSameResponse(
+            async_views.AsyncEnrollmentListByStudent, f'/api/enrollments/student/{self.student.pk}/', student_id=self.student.pk,
+        )
+
+    async def test_validation_errors(self):
+        response = await self.assertSameResponse(async_views.AsyncCommentList, '/api/comments/?course=abc')
+        self.assertEqual(json.loads(response.content), {'course': ['A valid integer is required.']})
+        await self.assertSameResponse(async_views.AsyncCommentList, '/api/comments/?after_id=x')
+
+    async def test_authentication_and_permissions(self):
+        response = await self.assertSameResponse(async_views.AsyncCourseList, '/api/courses/', {'Authorization': 'Token bogus'})
+        self.assertEqual(response.status_code, 401)
+        with mock.patch.object(CommentList, 'permission_classes', [IsAuthenticated]):
+            response = await self.assertSameResponse(async_views.AsyncCommentList, '/api/comments/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_response_cache(self):
+        view = async_to_sync(async_views.AsyncCategoryList.as_view())
+        response = view(AsyncRequestFactory().get('/api/categories/'))
+        with self.assertNumQueries(0):
+            repeat = view(AsyncRequestFactory().get('/api/categories/'))
+            not_modified = view(AsyncRequestFactory().get('/api/categories/', headers={'If-None-Match': response['ETag']}))
+        self.assertEqual(repeat.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+
+class StreamingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Math', description='Numbers')
+        teacher = User.objects.create(username='teacher', role='teacher')
+        student = User.objects.create(username='student', role='student')
+        for i in range(5):
+            course = Course.objects.create(title=f'Course {4 - i}', description='', teacher=teacher, category=category, price='10.00')
+            Enrollment.objects.create(student=student, course=course)
+
+    def setUp(self):
+        cache.clear()
+
+    def all_pages(self, url):
+        courses, data = [], self.client.get(url).json()
+        courses += data['courses']
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            courses += data['courses']
+        return courses
+
+    def ndjson(self, response):
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.endswith(b'\n'))
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_ndjson_matches_the_cursor_pages(self):
+        for query in ('page_size=2', 'page_size=2&ordering=title'):
+            pages = self.all_pages(f'/api/courses/?{query}')
+            self.assertEqual(len(pages), 5)
+            self.assertEqual(self.ndjson(self.client.get(f'/api/courses/?{query}&stream=ndjson')), pages, query)
+
+    def test_negotiation(self):
+        pages = self.all_pages('/api/courses/?page_size=2')
+        self.assertEqual(self.ndjson(self.client.get('/api/courses/', HTTP_ACCEPT='application/x-ndjson')), pages)
+        self.assertEqual(self.ndjson(self.client.get('/api/courses/?format=ndjson')), pages)
+
+        response = self.client.get('/api/courses/?stream=1')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), {'total_count': 5, 'courses': pages})
+        self.assertFalse(self.client.get('/api/courses/', HTTP_ACCEPT='application/json').streaming)
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    """The SQLite profile is applied per connection, checked in a fresh process."""
+
+    script = '''
+import django
+django.setup()
+from django.core.management import call_command
+from django.db import connection
+call_command('migrate', verbosity=0)
+with connection.cursor() as cursor:
+    cursor.execute('PRAGMA journal_mode')
+    print(cursor.fetchone()[0], connection.transaction_mode)
+call_command('load_test_writes', workers=2, students=4, courses=2)
+'''
+
+    def run_profile(self, tuned):
+        with tempfile.TemporaryDirectory() as path:
+            env = {key: value for key, value in os.environ.items() if key != 'SQLITE_TUNED'}
+            env.update(DJANGO_SETTINGS_MODULE='test_drf.settings', DATABASE_URL=f'sqlite:///{path}/profile.sqlite3')
+            if tuned is not None:
+                env['SQLITE_TUNED'] = tuned
+            result = subprocess.run(
+                [sys.executable, '-c', self.script], env=env, capture_output=True, text=True, timeout=120,
+                cwd=settings.BASE_DIR,
+            )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+
+    def test_tuned_sqlite(self):
+        output = self.run_profile('1')
+        self.assertTrue(output.startswith('wal IMMEDIATE\n'), output)
+        self.assertIn("'failures': 0", output.split('enrollment:')[1])
+        self.assertIn('PRAGMA busy_timeout=5000', output)
+
+    def test_stock_sqlite_by_default(self):
+        self.assertTrue(self.run_profile(None).startswith('delete None\n'))
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+
+class LocalSlidingWindowBackend:
+    """Exact sliding-window log per key, kept in process memory.
+
+    Each key holds at most `limit` timestamps and only the `max_keys` most
+    recently seen keys are kept, so memory stays bounded under a flood of
+    distinct usernames or addresses.
+    """
+
+    def __init__(self, max_keys=10000, **kwargs):
+        self.max_keys = max_keys
+        self._logs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        """Record an attempt; return None if allowed, else seconds until the next one is."""
+        now = time.monotonic()
+        with self._lock:
+            log = self._logs.get(key)
+            if log is None:
+                log = self._logs[key] = deque(maxlen=limit)
+                while len(self._logs) > self.max_keys:
+                    self._logs.popitem(last=False)
+            else:
+                self._logs.move_to_end(key)
+            while log and log[0] <= now - window:
+                log.popleft()
+            if len(log) >= limit:
+                return log[0] + window - now
+            log.append(now)
+            return None
+
+
+class CacheSlidingWindowBackend:
+    """Sliding-window counter in a shared Django cache, for multi-process deployments.
+
+    Weighs the previous fixed window by how much of it still overlaps the
+    sliding window, which approximates the exact log with two counters per key.
+    """
+
+    def __init__(self, cache_alias='default', **kwargs):
+        self.cache = caches[cache_alias]
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        current = int(now // window)
+        elapsed = (now % window) / window
+        current_key, previous_key = f'ratelimit:{key}:{current}', f'ratelimit:{key}:{current - 1}'
+        counts = self.cache.get_many([current_key, previous_key])
+        estimate = counts.get(previous_key, 0) * (1 - elapsed) + counts.get(current_key, 0)
+        if estimate >= limit:
+            return window * (1 - elapsed)
+        self.cache.add(current_key, 0, timeout=window * 2)
+        self.cache.incr(current_key)
+        return None
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        config = settings.LOGIN_RATE_LIMIT
+        _backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _backend
+
+
+class LoginRateThrottle(BaseThrottle):
+    """Limit login attempts per client address and per username.
+
+    Every attempt counts, not just failures: each one costs a password hash.
+    """
+
+    def allow_request(self, request, view):
+        config = settings.LOGIN_RATE_LIMIT
+        data = request.data
+        # A body that is not an object has no username; the serializer rejects it.
+        username = str(data.get('username', '')).strip().lower() if isinstance(data, Mapping) else ''
+        self._wait = None
+        for scope, ident, limit in (
+            ('ip', self.get_ident(request), config['IP_ATTEMPTS']),
+            ('username', username, config['USERNAME_ATTEMPTS']),
+        ):
+            if not ident:
+                continue
+            wait = get_backend().hit(f'login:{scope}:{ident}', limit, config['WINDOW'])
+            if wait is not None:
+                self._wait = wait
+                return False
+        return True
+
+    def wait(self):
+        return self._wait
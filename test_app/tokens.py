@@ -0,0 +1,23 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import RevokedToken
+
+
+def issue_tokens(user):
+    """Refresh/access pair whose claims carry what the role checks need."""
+    refresh = RefreshToken.for_user(user)
+    refresh['role'] = user.role
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def is_revoked(refresh):
+    return RevokedToken.objects.filter(jti=refresh['jti']).exists()
+
+
+def revoke(refresh):
+    expires_at = datetime.fromtimestamp(refresh['exp'], tz=dt_timezone.utc)
+    RevokedToken.objects.get_or_create(jti=refresh['jti'], defaults={'expires_at': expires_at})
+    RevokedToken.objects.filter(expires_at__lt=timezone.now()).delete()
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import threading
+
+from django.urls import get_resolver
+from django.urls.converters import get_converters
+from django.utils.html import format_html, format_html_join
+
+from .lru import LRUCache
+
+# Rendered pages per (base URL, format); the host comes from the request, so this stays bounded.
+RENDERED_CACHE_SIZE = 64
+
+
+def _converter_names():
+    return {type(converter): name for name, converter in get_converters().items()}
+
+
+def build_entries(resolver, descriptions):
+    """The named routes of `resolver`, in `reverse_dict` order, with their converters.
+
+    Each entry has the `name`, the `path` relative to the mount point (with
+    `<converter:param>` placeholders), `parameters` mapping each parameter to
+    its converter name, and the `description`. Like `reverse()`, the first
+    registered pattern of a name wins.
+    """
+    converter_names = _converter_names()
+    entries = []
+    for name in resolver.reverse_dict:
+        if not isinstance(name, str):
+            continue
+        possibilities, _pattern, _defaults, converters = resolver.reverse_dict.getlist(name)[0]
+        format_string, params = possibilities[0]
+        parameters = {
+            param: converter_names.get(type(converters[param]), type(converters[param]).__name__) if param in converters else 'str'
+            for param in params
+        }
+        path = format_string % {param: f'<{converter}:{param}>' for param, converter in parameters.items()}
+        entries.append({
+            'name': name,
+            'path': path,
+            'parameters': parameters,
+            'description': descriptions.get(name, 'No description available'),
+        })
+    return entries
+
+
+class URLIndex:
+    """The URL catalogue of one resolver, rendered at most once per base URL and format."""
+
+    def __init__(self, resolver, descriptions):
+        self.resolver = resolver
+        self.entries = build_entries(resolver, descriptions)
+        self.rendered = LRUCache(maxsize=RENDERED_CACHE_SIZE, ttl=float('inf'))
+
+    def render(self, base_url, as_json):
+        """`(body, etag)` of the page for `base_url` (which ends with a slash)."""
+        key = (base_url, as_json)
+        cached = self.rendered.get(key)
+        if cached is None:
+            body = (self.render_json if as_json else self.render_html)(base_url).encode()
+            cached = (body, f'"{hashlib.md5(body).hexdigest()}"')
+            self.rendered.set(key, cached)
+        return cached
+
+    def render_json(self, base_url):
+        return json.dumps({'urls': [
+            {**entry, 'url': base_url + entry['path'] if not entry['parameters'] else None}
+            for entry in self.entries
+        ]})
+
+    def render_html(self, base_url):
+        items = format_html_join('', '{}', (
+            (format_html('<li><a href="{}">{}</a> - {}</li>', base_url + entry['path'], entry['name'], entry['description'])
+             if not entry['parameters'] else
+             format_html('<li>{} (URL requires parameters: <code>{}</code>) - {}</li>',
+                         entry['name'], base_url + entry['path'], entry['description']),)
+            for entry in self.entries
+        ))
+        return format_html('<h1>Available URLs</h1><ul>{}</ul>', items)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_url_index(urlconf, descriptions):
+    """The `URLIndex` for `urlconf`, rebuilt only when its resolver changes.
+
+    `get_resolver` is cached per URLconf until `clear_url_caches()` runs,
+    which Django does whenever ROOT_URLCONF changes, so a new resolver
+    object means the routes may have changed.
+    """
+    global _index
+    resolver = get_resolver(urlconf)
+    index = _index
+    if index is None or index.resolver is not resolver:
+        with _lock:
+            index = _index
+            if index is None or index.resolver is not resolver:
+                index = _index = URLIndex(resolver, descriptions)
+    return index
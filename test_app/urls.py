@@ -1,26 +1,46 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views
 from .views import (
     UserList, UserDetail,
     CategoryList,
     CourseList, CourseDetail,
-    EnrollmentList,
-    CommentList, UserRegistrationView, UserLoginApiView, UserLogoutApiView, ActivateAccountView, EnrollmentListByStudent, CourseCreateAPIView, TeacherList, list_urls
+    EnrollmentList, EnrollmentBulkCreateView,
+    CommentList, UserRegistrationView, UserLoginApiView, UserLogoutApiView, ActivateAccountView, EnrollmentListByStudent, CourseCreateAPIView, TeacherList, TokenRefreshApiView, list_urls, course_events
 )
 
+
+def read_view(name, sync_view, async_view):
+    """Pick the native async GET variant for the url names listed in ASYNC_READ_VIEWS."""
+    if name in settings.ASYNC_READ_VIEWS:
+        return async_view.as_view()
+    return sync_view.as_view()
+
+
+def hashing_view(sync_view, async_view):
+    """Views that hash passwords await the hashing pool when PASSWORD_HASHING_OFFLOAD is on."""
+    if getattr(settings, 'PASSWORD_HASHING_OFFLOAD', False):
+        return async_view.as_view()
+    return sync_view.as_view()
+
+
 urlpatterns = [
     path('users/', UserList.as_view(), name='user-list'),
     path('users/<int:pk>/', UserDetail.as_view(), name='user-detail'),
-    path('categories/', CategoryList.as_view(), name='category-list'),
-    path('courses/', CourseList.as_view(), name='course-list'),
+    path('categories/', read_view('category-list', CategoryList, async_views.AsyncCategoryList), name='category-list'),
+    path('courses/', read_view('course-list', CourseList, async_views.AsyncCourseList), name='course-list'),
     path('courses/<int:pk>/', CourseDetail.as_view(), name='course-detail'),
+    path('courses/<int:pk>/events/', course_events, name='course-events'),
     path('enrollments/', EnrollmentList.as_view(), name='enrollment-list'), 
-    path('enrollments/student/<int:student_id>/', EnrollmentListByStudent.as_view(), name='enrollments-by-student'),
-    path('comments/', CommentList.as_view(), name='comment-list'), 
-    path('register/', UserRegistrationView.as_view(), name='register'),
-    path('login/', UserLoginApiView.as_view(), name='login'),
+    path('enrollments/bulk/', EnrollmentBulkCreateView.as_view(), name='enrollment-bulk-create'),
+    path('enrollments/student/<int:student_id>/', read_view('enrollments-by-student', EnrollmentListByStudent, async_views.AsyncEnrollmentListByStudent), name='enrollments-by-student'),
+    path('comments/', read_view('comment-list', CommentList, async_views.AsyncCommentList), name='comment-list'), 
+    path('register/', hashing_view(UserRegistrationView, async_views.AsyncRegistrationView), name='register'),
+    path('login/', hashing_view(UserLoginApiView, async_views.AsyncLoginView), name='login'),
     path('logout/', UserLogoutApiView.as_view(), name='logout'),
+    path('token/refresh/', TokenRefreshApiView.as_view(), name='token-refresh'),
     path('active/<uid64>/<token>/', ActivateAccountView.as_view(), name='activate'),
     path('courses/create/', CourseCreateAPIView.as_view(), name='course-create'),
-    path('teachers/', TeacherList.as_view(), name='teacher-list'),
+    path('teachers/', read_view('teacher-list', TeacherList, async_views.AsyncTeacherList), name='teacher-list'),
     path('', list_urls, name='list_urls'),
 ]
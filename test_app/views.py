@@ -1,11 +1,19 @@
-from django.utils.html import format_html
+from collections.abc import Mapping
+
 from django.http import HttpResponse
-from django.urls import get_resolver, reverse
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import generics, permissions, status
 from .models import User, Category, Course, Enrollment, Comment
-from .serializers import UserSerializer, CategorySerializer, CourseSerializer, EnrollmentSerializer, CommentSerializer, UserLoginSerializer
-from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
+from . import outbox
+from .caching import CachedResponseMixin
+from .emails import confirm_email
+from .fieldsets import FieldSelectionMixin
+from .hashers import offload
+from .pagination import CommentCursorPagination, CourseCursorPagination, EnrollmentCursorPagination
+from .search import search_courses
+from .streaming import StreamingListMixin
+from .serializers import UserSerializer, CategorySerializer, CourseSerializer, EnrollmentSerializer, CommentSerializer, UserLoginSerializer, BulkEnrollmentSerializer, RevocableTokenRefreshSerializer
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from rest_framework.views import APIView
@@ -14,45 +22,61 @@ from django.contrib.auth.tokens import default_token_generator
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate, login, logout
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
-
-class UserList(generics.ListAPIView):
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
+from django.conf import settings
+from .throttling import LoginRateThrottle
+from .tokens import issue_tokens, revoke
+
+class UserList(FieldSelectionMixin, StreamingListMixin, CachedResponseMixin, generics.ListAPIView):
+    cache_namespaces = ('users',)
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
-class UserDetail(generics.RetrieveUpdateDestroyAPIView):
+class UserDetail(FieldSelectionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
-class CategoryList(generics.ListCreateAPIView):
+class CategoryList(FieldSelectionMixin, CachedResponseMixin, generics.ListCreateAPIView):
+    cache_namespaces = ('categories',)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
-class CategoryDetail(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetail(FieldSelectionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
-class CourseList(generics.ListAPIView):
+class CourseFieldSelectionMixin(FieldSelectionMixin):
+    select_related_fields = {
+        'teacher': ('teacher_name', 'teacher_image'),
+        'category': ('category_name',),
+    }
+
+    def get_prefetches(self):
+        prefetches = []
+        if self.field_selected('comments'):
+            prefetches.append(Prefetch('comments', queryset=Comment.objects.select_related('student')))
+        if self.field_selected('students'):
+            prefetches.append('students')
+        return prefetches
+
+class CourseList(CourseFieldSelectionMixin, StreamingListMixin, CachedResponseMixin, generics.ListAPIView):
+    cache_namespaces = ('course-list',)
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    pagination_class = CourseCursorPagination
     ordering_fields = ['title', 'created_at']
+    stream_envelope = 'courses'
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-
-        total_count = queryset.count()
-
-        serializer = self.get_serializer(queryset, many=True)
-
-        response_data = {
-            'total_count': total_count,
-            'courses': serializer.data
-        }
-
-        return Response(response_data)
+    def get_stream_queryset(self):
+        # Same row order as walking every page with the cursor.
+        queryset = super().get_stream_queryset()
+        return queryset.order_by(*self.paginator.get_ordering(self.request, queryset, self))
 
     def get_queryset(self):
-        queryset = Course.objects.all()
+        queryset = self.apply_field_plan(Course.objects.all())
 
         teacher_id = self.request.query_params.get('teacher')
 
@@ -68,6 +92,11 @@ class CourseList(generics.ListAPIView):
         if category_id:
             queryset = queryset.filter(category_id=category_id)
 
+        query = self.request.query_params.get('q', '').strip()
+        if query:
+            # Ranked by relevance unless `?ordering=` asks otherwise, see CourseCursorPagination.
+            queryset = search_courses(queryset, query)
+
         ordering = self.request.query_params.get('ordering')
         if ordering in self.ordering_fields:
             queryset = queryset.order_by(ordering)
@@ -92,7 +121,9 @@ class CourseCreateAPIView(generics.CreateAPIView):
             raise PermissionDenied("Only teachers can create courses.")
         serializer.save()
 
-class CourseDetail(generics.RetrieveUpdateDestroyAPIView):
+class CourseDetail(CourseFieldSelectionMixin, CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_namespaces = ('course-refs', 'course:{pk}')
+    cache_per_user = True
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
@@ -100,14 +131,14 @@ class CourseDetail(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_authenticated:
-            return Course.objects.filter(teacher=user)
+            return self.apply_field_plan(Course.objects.filter(teacher_id=user.pk))
         raise PermissionDenied("Please Login to see all courses.")
 
     def perform_update(self, serializer):
         user = self.request.user
         if not user.is_authenticated or user.role != 'teacher':
             raise PermissionDenied("You do not have permission to edit this course.")
-        if serializer.instance.teacher != user:
+        if serializer.instance.teacher_id != user.pk:
             raise PermissionDenied("You do not have permission to edit this course.")
         serializer.save()
 
@@ -115,13 +146,19 @@ class CourseDetail(generics.RetrieveUpdateDestroyAPIView):
         user = self.request.user
         if not user.is_authenticated or user.role != 'teacher':
             raise PermissionDenied("You do not have permission to delete this course.")
-        if instance.teacher != user:
+        if instance.teacher_id != user.pk:
             raise PermissionDenied("You do not have permission to delete this course.")
         instance.delete()
-class EnrollmentList(generics.ListCreateAPIView):
+class EnrollmentList(FieldSelectionMixin, generics.ListCreateAPIView):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = EnrollmentCursorPagination
+    select_related_fields = {
+        'student': ('student_info',),
+        'course__teacher': ('course_info',),
+        'course__category': ('course_info',),
+    }
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -136,15 +173,78 @@ class EnrollmentList(generics.ListCreateAPIView):
             raise PermissionDenied("Only students can enroll in courses.")
         serializer.save()
 
-class EnrollmentDetail(generics.RetrieveUpdateDestroyAPIView):
+class EnrollmentBulkCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_batch_size = 500
+
+    def post(self, request):
+        user = request.user
+        if user.role != 'student':
+            raise PermissionDenied("Only students can enroll in courses.")
+        serializer = BulkEnrollmentSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.max_batch_size,
+            context={'request': request},
+        )
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        created = [result['enrollment'] for result in results if result['enrollment'] is not None]
+        data = iter(EnrollmentSerializer(created, many=True, context={'request': request}).data)
+        response_data = [
+            {'index': index, 'status': 'created', 'enrollment': next(data)}
+            if result['enrollment'] is not None else
+            {'index': index, 'status': 'error', 'errors': result['errors']}
+            for index, result in enumerate(results)
+        ]
+        response_status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created_count': len(created), 'results': response_data}, status=response_status)
+
+class EnrollmentDetail(FieldSelectionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
+    select_related_fields = EnrollmentList.select_related_fields
 
-class CommentList(generics.ListCreateAPIView):
+class CommentList(FieldSelectionMixin, StreamingListMixin, CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    pagination_class = CommentCursorPagination
+    select_related_fields = {
+        'student': ('student_name', 'student_image'),
+    }
     # permission_classes = [IsAuthenticated]
 
+    def get_course_id(self):
+        course_id = self.request.query_params.get('course')
+        if course_id is None:
+            return None
+        try:
+            return int(course_id)
+        except ValueError:
+            raise ValidationError({'course': ['A valid integer is required.']})
+
+    def get_cache_namespaces(self):
+        # Polling one course's comments only misses the cache when that course gets a comment.
+        course_id = self.get_course_id()
+        return ['users', 'comments' if course_id is None else f'comments:{course_id}']
+
+    def get_queryset(self):
+        queryset = self.apply_field_plan(Comment.objects.all())
+        course_id = self.get_course_id()
+        if course_id is not None:
+            # Served by the (course, created_at) index.
+            queryset = queryset.filter(course_id=course_id)
+        return queryset
+
+    def get_stream_queryset(self):
+        # The same rows, in the same order, as walking the paginated feed:
+        # newest first, or only those after `after_id`/`since`, oldest first.
+        queryset = super().get_stream_queryset()
+        incremental = self.paginator.get_incremental_filter(self.request)
+        if incremental is None:
+            return queryset.order_by(*self.paginator.get_ordering(self.request, queryset, self))
+        ordering, lookups = incremental
+        return queryset.filter(**lookups).order_by(*ordering)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({
@@ -155,16 +255,30 @@ class CommentList(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save()
 
-class CommentDetail(generics.RetrieveUpdateDestroyAPIView):
+class CommentDetail(FieldSelectionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    select_related_fields = CommentList.select_related_fields
 
-class EnrollmentListByStudent(generics.ListAPIView):
+class EnrollmentListByStudent(FieldSelectionMixin, generics.ListAPIView):
     serializer_class = EnrollmentSerializer
+    pagination_class = EnrollmentCursorPagination
+    # Every row has the same student: it is loaded once in get_queryset, not joined.
+    select_related_fields = {
+        'course__teacher': ('course_info',),
+        'course__category': ('course_info',),
+    }
 
     def get_queryset(self):
         student_id = self.kwargs['student_id']
-        return Enrollment.objects.filter(student_id=student_id)
+        queryset = Enrollment.objects.filter(student_id=student_id)
+        if self.field_selected('student_info'):
+            student = User.objects.filter(pk=student_id).first()
+            if student is None:
+                return Enrollment.objects.none()
+            # Rows fetched through the related manager come with `student` already set.
+            queryset = student.enrollment_set.all()
+        return self.apply_field_plan(queryset)
 
 class UserRegistrationView(APIView):
     serializer_class = UserSerializer
@@ -172,17 +286,20 @@ class UserRegistrationView(APIView):
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
+            return self.register(serializer)
+        return Response(serializer.errors)
+
+    def register(self, serializer):
+        with transaction.atomic():
             user = serializer.save() 
             token = default_token_generator.make_token(user)
             uid = urlsafe_base64_encode(force_bytes(user.pk))
             confirm_link = f"http://127.0.0.1:8000/api/active/{uid}/{token}"
             email_subject = "Confirm Your Email"
-            email_body = render_to_string('confirm_email.html', {'confirm_link': confirm_link})
-            email = EmailMultiAlternatives(email_subject, '', to=[user.email])
-            email.attach_alternative(email_body, 'text/html')
-            email.send()
-            return Response({"message":"Check your email for confirmation.", "credentials": {"uid": uid, "token": token}})
-        return Response(serializer.errors)
+            email_body = confirm_email.render(confirm_link=confirm_link)
+            # Delivered by `manage.py send_outbox` (or the in-process drainer).
+            outbox.enqueue(email_subject, user.email, html_body=email_body)
+        return Response({"message":"Check your email for confirmation.", "credentials": {"uid": uid, "token": token}})
 
 class ActivateAccountView(APIView):
     def get(self, request, uid64, token):
@@ -200,25 +317,40 @@ class ActivateAccountView(APIView):
             return Response({'status': 'failure'}, status=status.HTTP_400_BAD_REQUEST)
 
 class UserLoginApiView(APIView):
+    throttle_classes = [LoginRateThrottle]
+
     def post(self, request):
         serializer = UserLoginSerializer(data=self.request.data)
         if serializer.is_valid():
             username = serializer.validated_data['username']
             password = serializer.validated_data['password']
 
-            user = authenticate(username=username, password=password)
-
-            if user:
-                token, _ = Token.objects.get_or_create(user=user)
-                login(request, user)
-                return Response({'token': token.key, 'user_id': user.id, 'user_email' : user.email, 'user_role' : user.role, 'image_url' : user.image, 'user_name': user.username})
-            return Response({'error': 'Invalid username or password'})
+            user = offload(authenticate, username=username, password=password)
+            return self.login_response(request, user)
         return Response(serializer.errors)
+
+    def login_response(self, request, user):
+        if user and settings.AUTH_MODE == 'jwt':
+            # Stateless: no DB token and no session, everything is in the signed claims.
+            return Response({**issue_tokens(user), 'user_id': user.id, 'user_email' : user.email, 'user_role' : user.role, 'image_url' : user.image, 'user_name': user.username})
+        if user:
+            token, _ = Token.objects.get_or_create(user=user)
+            login(request, user)
+            return Response({'token': token.key, 'user_id': user.id, 'user_email' : user.email, 'user_role' : user.role, 'image_url' : user.image, 'user_name': user.username})
+        return Response({'error': 'Invalid username or password'})
     
 class UserLogoutApiView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        if settings.AUTH_MODE == 'jwt':
+            if not isinstance(request.data, Mapping):
+                raise ValidationError({'non_field_errors': ['Expected an object with a refresh token.']})
+            try:
+                revoke(RefreshToken(request.data.get('refresh', '')))
+            except TokenError:
+                pass
+            return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
         try:
             request.user.auth_token.delete()
         except (AttributeError):
@@ -226,7 +358,11 @@ class UserLogoutApiView(APIView):
         logout(request)
         return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
 
-class TeacherList(generics.ListCreateAPIView):
+class TokenRefreshApiView(TokenRefreshView):
+    serializer_class = RevocableTokenRefreshSerializer
+
+class TeacherList(FieldSelectionMixin, CachedResponseMixin, generics.ListCreateAPIView):
+    cache_namespaces = ('users',)
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
@@ -236,9 +372,17 @@ class TeacherList(generics.ListCreateAPIView):
 
 
 # test_app/views.py
-from django.http import HttpResponse
-from django.urls import get_resolver, reverse
-from django.utils.html import format_html
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import get_urlconf
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from rest_framework.exceptions import NotFound
+
+from .events import CLOSED, course_channel, hub
+from .renderers import FastJSONRenderer
+from .url_index import get_url_index
 
 # Dictionary to map URL names to descriptions
 url_descriptions = {
@@ -249,33 +393,96 @@ url_descriptions = {
     'course-detail': 'Detail view of a specific course',
     'enrollment-list': 'List all enrollments',
     'enrollments-by-student': 'List all enrollments for a specific student',
+    'enrollment-bulk-create': 'Enroll in several courses at once',
     'comment-list': 'List all comments',
     'register': 'User registration',
     'login': 'User login',
     'logout': 'User logout',
+    'token-refresh': 'Exchange a JWT refresh token for a new access token',
     'activate': 'Activate user account',
     'course-create': 'Create a new course',
     'teacher-list': 'List all teachers',
+    'course-events': 'Server-sent stream of new comments and enrollments for a course (ASGI only)',
 }
 
 def list_urls(request):
-    urlconf = get_resolver()
-    urls = urlconf.reverse_dict.keys()
-    scheme = request.scheme
-    host = request.get_host()
-    base_url = f"{scheme}://{host}/api/"
-    
-    response = '<h1>Available URLs</h1><ul>'
-    for url in urls:
-        if isinstance(url, str):  # Filter out non-string keys
-            try:
-                url_path = reverse(url)
-                full_url = base_url + url_path.lstrip('/')
-                description = url_descriptions.get(url, 'No description available')
-                response += format_html('<li><a href="{}">{}</a> - {}</li>', full_url, url, description)
-            except Exception as e:
-                # Handle exceptions for URL patterns that require parameters
-                response += format_html('<li>{} (URL requires parameters) - {}</li>', url, description)
-    response += '</ul>'
-    return HttpResponse(response)
-
+    """Index of the named API routes, as HTML or (`?format=json` / `Accept: application/json`) JSON.
+
+    The catalogue is built once per URLconf by `test_app.url_index` and each
+    page is rendered once per host; repeat requests are served from memory
+    and revalidate with the ETag.
+    """
+    index = get_url_index(get_urlconf(), url_descriptions)
+    as_json = request.GET.get('format') == 'json' or (
+        'format' not in request.GET and 'application/json' in request.headers.get('Accept', '')
+    )
+    body, etag = index.render(f"{request.scheme}://{request.get_host()}/api/", as_json)
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        patch_vary_headers(not_modified, ['Accept'])
+        return not_modified
+    response = HttpResponse(body, content_type='application/json' if as_json else 'text/html; charset=utf-8')
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+class CourseEventsAccess(APIView):
+    """Authentication and permission checks for `course_events`, as for `enrollments/`."""
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer]
+
+    def perform_content_negotiation(self, request, force=False):
+        # Clients ask for text/event-stream; errors are always JSON.
+        return super().perform_content_negotiation(request, force=True)
+
+
+async def course_events(request, pk):
+    """Server-sent events for the comments and enrollments added to course `pk`.
+
+    Each event's `data` is the comment or enrollment as the REST API renders
+    it. A client that falls behind loses the oldest queued events (or, with
+    the `disconnect` policy, the connection) and catches up from
+    `comments/?course=<pk>&after_id=<id>` before listening again (see
+    `CommentCursorPagination` for the caveat outside SQLite).
+    Requires an authenticated user, like the enrollment list.
+    Only served under ASGI: a WSGI worker would be held for the whole stream.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Event streams are only served by the ASGI application.'}, status=501)
+    access = CourseEventsAccess()
+    access.setup(request, pk=pk)
+    access.request = access.initialize_request(request, pk=pk)
+    access.headers = access.default_response_headers
+    try:
+        await sync_to_async(access.initial)(access.request, pk=pk)
+        if not await Course.objects.filter(pk=pk).aexists():
+            raise NotFound('No Course matches the given query.')
+    except Exception as exc:
+        return access.finalize_response(access.request, access.handle_exception(exc)).render()
+
+    config = settings.COURSE_EVENTS
+    subscription = hub.subscribe(course_channel(pk), config['QUEUE_SIZE'], config['SLOW_CONSUMER'])
+
+    async def stream():
+        try:
+            yield b'retry: %d\n\n' % (config['RETRY'] * 1000)
+            while True:
+                message = await subscription.get(timeout=config['KEEPALIVE'])
+                if message is None:
+                    yield b': keepalive\n\n'
+                elif message is CLOSED:
+                    yield b'event: overflow\ndata: {}\n\n'
+                    return
+                else:
+                    yield message
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_drf.settings')
+os.environ.setdefault('PASSWORD_HASHING_OFFLOAD', 'true')
 
 application = get_asgi_application()
+
+# Each ASGI process listens for course events published by the others.
+from test_app.events import get_broker  # noqa: E402
+
+get_broker().start()